@@ -0,0 +1,256 @@
+import numpy as np
+
+
+class GradientDescent():
+    """
+    Class for the plain gradient descent update, coefficients - learning_rate * gradient.
+    Every optimizer has the same step function, so they can be swapped in Polynomial_GD.
+
+    ::param learning_rate: (float) Weight applied to the gradient
+    """
+
+    def __init__(self, learning_rate = 0.0001):
+        """
+        Initialisation function of the optimizer.
+
+        ::param learning_rate: (float) Weight applied to the gradient, default = 0.0001
+
+        ::returns: (Class GradientDescent)
+        """
+        self.learning_rate = learning_rate
+        self.reset()
+
+
+    def reset(self):
+        """
+        Function to forget the state of previous steps, before a new fit.
+        """
+        pass
+
+
+    def step(self, coefficients, loss, gradient, loss_and_gradient):
+        """
+        Function to return the coefficients after one step.
+
+        ::param coefficients: (numpy array)
+        ::param loss: (float) Loss of the coefficients
+        ::param gradient: (numpy array) Gradient of the loss at the coefficients
+        ::param loss_and_gradient: (function) Returns the loss and gradient of other coefficients
+        ::returns: (numpy array)
+        """
+        return coefficients - self.learning_rate*gradient
+
+
+class Momentum(GradientDescent):
+    """
+    Class for gradient descent with momentum, or Nesterov momentum.
+    The update is a running sum of the gradients, decayed by momentum,
+        which speeds up along directions where the gradient keeps its sign.
+
+    ::param learning_rate: (float) Weight applied to the gradient
+    ::param momentum: (float) Decay of the running sum of the gradients
+    ::param nesterov: (bool) Use Nesterov momentum
+    """
+
+    def __init__(self, learning_rate = 0.01, momentum = 0.9, nesterov = False):
+        """
+        Initialisation function of the optimizer.
+
+        ::param learning_rate: (float) Weight applied to the gradient, default = 0.01
+        ::param momentum: (float) Decay of the running sum of the gradients, default = 0.9
+        ::param nesterov: (bool) Use Nesterov momentum, default = False
+
+        ::returns: (Class Momentum)
+        """
+        self.momentum = momentum
+        self.nesterov = nesterov
+        super().__init__(learning_rate)
+
+
+    def reset(self):
+        """
+        Function to forget the state of previous steps, before a new fit.
+        """
+        self.velocity = 0
+
+
+    def step(self, coefficients, loss, gradient, loss_and_gradient):
+        """
+        Function to return the coefficients after one step.
+        Nesterov momentum uses the equivalent form with the gradient at the coefficients
+            (Sutskever et al.), so it needs no extra gradient.
+
+        ::param coefficients: (numpy array)
+        ::param loss: (float) Loss of the coefficients
+        ::param gradient: (numpy array) Gradient of the loss at the coefficients
+        ::param loss_and_gradient: (function) Returns the loss and gradient of other coefficients
+        ::returns: (numpy array)
+        """
+        velocity = self.momentum*self.velocity - self.learning_rate*gradient
+        if self.nesterov:
+            coefficients = coefficients - self.momentum*self.velocity + (1 + self.momentum)*velocity
+        else:
+            coefficients = coefficients + velocity
+        self.velocity = velocity
+
+        return coefficients
+
+
+class Adam(GradientDescent):
+    """
+    Class for the Adam optimizer (Kingma and Ba).
+    Each coefficient has its own step size, from running means of the gradient
+        and of the squared gradient, so badly scaled coefficients move at the same rate.
+
+    ::param learning_rate: (float) Size of the steps
+    ::param beta1: (float) Decay of the running mean of the gradient
+    ::param beta2: (float) Decay of the running mean of the squared gradient
+    ::param epsilon: (float) Added to the denominator, for stability
+    """
+
+    def __init__(self, learning_rate = 0.01, beta1 = 0.9, beta2 = 0.999, epsilon = 1e-8):
+        """
+        Initialisation function of the optimizer.
+
+        ::param learning_rate: (float) Size of the steps, default = 0.01
+        ::param beta1: (float) Decay of the running mean of the gradient, default = 0.9
+        ::param beta2: (float) Decay of the running mean of the squared gradient, default = 0.999
+        ::param epsilon: (float) Added to the denominator, for stability, default = 1e-8
+
+        ::returns: (Class Adam)
+        """
+        self.beta1 = beta1
+        self.beta2 = beta2
+        self.epsilon = epsilon
+        super().__init__(learning_rate)
+
+
+    def reset(self):
+        """
+        Function to forget the state of previous steps, before a new fit.
+        """
+        self.mean = 0
+        self.squared_mean = 0
+        self.n_steps = 0
+
+
+    def step(self, coefficients, loss, gradient, loss_and_gradient):
+        """
+        Function to return the coefficients after one step.
+
+        ::param coefficients: (numpy array)
+        ::param loss: (float) Loss of the coefficients
+        ::param gradient: (numpy array) Gradient of the loss at the coefficients
+        ::param loss_and_gradient: (function) Returns the loss and gradient of other coefficients
+        ::returns: (numpy array)
+        """
+        self.n_steps += 1
+        self.mean = self.beta1*self.mean + (1 - self.beta1)*gradient
+        self.squared_mean = self.beta2*self.squared_mean + (1 - self.beta2)*gradient**2
+
+        # The running means start at 0, so are corrected for the bias towards 0
+        mean = self.mean/(1 - self.beta1**self.n_steps)
+        squared_mean = self.squared_mean/(1 - self.beta2**self.n_steps)
+
+        return coefficients - self.learning_rate*mean/(np.sqrt(squared_mean) + self.epsilon)
+
+
+class LBFGS(GradientDescent):
+    """
+    Class for the L-BFGS optimizer, with a backtracking line search.
+    The direction approximates the Newton step, from the changes of the coefficients
+        and gradients of the last memory steps, and the line search halves the step
+        until the loss decreases enough (Armijo condition).
+    It needs the gradient of all the rows (no batch_size).
+
+    ::param memory: (int) Number of previous steps used for the direction
+    ::param c1: (float) Fraction of the predicted decrease the loss should decrease by
+    ::param max_halvings: (int) Maximum number of times the step is halved
+    """
+
+    def __init__(self, memory = 10, c1 = 1e-4, max_halvings = 40):
+        """
+        Initialisation function of the optimizer.
+
+        ::param memory: (int) Number of previous steps used for the direction, default = 10
+        ::param c1: (float) Fraction of the predicted decrease the loss should decrease by,
+                                default = 1e-4
+        ::param max_halvings: (int) Maximum number of times the step is halved, default = 40
+
+        ::returns: (Class LBFGS)
+        """
+        self.memory = memory
+        self.c1 = c1
+        self.max_halvings = max_halvings
+        super().__init__(1.0)
+
+
+    def reset(self):
+        """
+        Function to forget the state of previous steps, before a new fit.
+        """
+        self.changes = []
+        self.previous = None
+
+
+    def direction(self, gradient):
+        """
+        Function to return the L-BFGS direction, -H @ gradient,
+            with the two loop recursion over the remembered steps.
+
+        ::param gradient: (numpy array)
+        ::returns: (numpy array)
+        """
+        direction = gradient.copy()
+        alphas = []
+        for s, y, rho in reversed(self.changes):
+            alpha = rho*(s @ direction)
+            direction -= alpha*y
+            alphas.append(alpha)
+
+        if self.changes:
+            s, y, _ = self.changes[-1]
+            direction *= (s @ y)/(y @ y)
+        else:
+            direction /= max(np.linalg.norm(gradient), 1)
+
+        for (s, y, rho), alpha in zip(self.changes, reversed(alphas)):
+            beta = rho*(y @ direction)
+            direction += (alpha - beta)*s
+
+        return -direction
+
+
+    def step(self, coefficients, loss, gradient, loss_and_gradient):
+        """
+        Function to return the coefficients after one step.
+
+        ::param coefficients: (numpy array)
+        ::param loss: (float) Loss of the coefficients
+        ::param gradient: (numpy array) Gradient of the loss at the coefficients
+        ::param loss_and_gradient: (function) Returns the loss and gradient of other coefficients
+        ::returns: (numpy array)
+        """
+        if self.previous is not None:
+            s = coefficients - self.previous[0]
+            y = gradient - self.previous[1]
+            # Only steps with positive curvature keep the approximation positive definite
+            if s @ y > 1e-12*np.linalg.norm(s)*np.linalg.norm(y):
+                self.changes = (self.changes + [(s, y, 1/(s @ y))])[-self.memory:]
+        self.previous = (coefficients, gradient)
+
+        direction = self.direction(gradient)
+        slope = gradient @ direction
+        if slope >= 0:
+            self.changes = []
+            direction = self.direction(gradient)
+            slope = gradient @ direction
+
+        step_size = self.learning_rate
+        for _ in range(self.max_halvings):
+            new_coefficients = coefficients + step_size*direction
+            if loss_and_gradient(new_coefficients)[0] <= loss + self.c1*step_size*slope:
+                break
+            step_size /= 2
+
+        return new_coefficients
@@ -1,7 +1,13 @@
+import logging
 import random
 import numpy as np
 import matplotlib.pyplot as plt
 
+from .optimizers import GradientDescent
+from .training_history import TrainingHistory
+
+logger = logging.getLogger(__name__)
+
 class Polynomial_GD():
     """
     Class to predict a polynomial function from data.
@@ -13,6 +19,18 @@ class Polynomial_GD():
     ::param learning_rate: (float) Learning rate of the gradient descent, default = 0.0001
     ::param early_stop: (float) Stops if loss difference of 2 steps < early_stop, default = 1e-04
     ::param steps: (int) maximum number of steps of gradient descent, default = 100000
+    ::param history_size: (int) Number of losses kept, default = 100000
+    ::param record_every: (int) Record the loss of one step in record_every, default = 1
+    ::param callback: (function) Called as callback(step, loss, coefficients) on recorded steps
+    ::param batch_size: (int) Number of rows per step, default None, all the rows
+    ::param epochs: (int) Maximum number of passes over the data with a batch_size
+    ::param shuffle: (bool) Shuffle the rows every epoch, default = True
+    ::param random_state: (int) Seed of the shuffling
+    ::param optimizer: (Class GradientDescent) How the coefficients are updated from the gradient
+    ::param scale_x: (bool) Fit on x scaled to [-1, 1]
+    ::param method: (string) "gradient_descent", "lstsq" or "streaming"
+    ::param x_range: (tuple) (min, max) of x, to scale x without reading the data
+    ::param chunk_size: (int) Number of rows read at a time by "streaming"
     """
     
     def __init__(
@@ -21,6 +39,18 @@ class Polynomial_GD():
         learning_rate = 0.0001,
         early_stop = 1e-4,
         steps = 100000,
+        history_size = 100000,
+        record_every = 1,
+        callback = None,
+        batch_size = None,
+        epochs = None,
+        shuffle = True,
+        random_state = None,
+        optimizer = None,
+        scale_x = False,
+        method = "gradient_descent",
+        x_range = None,
+        chunk_size = 1000000,
     ):
         """
         Initialisation function for predicting a polynomial.
@@ -30,11 +60,56 @@ class Polynomial_GD():
         ::param learning_rate: (float) Learning rate of the gradient descent, default = 0.0001
         ::param early_stop: (float) Stops if loss difference of 2 steps < early_stop, default = 1e-04
         ::param steps: (int) maximum number of steps of gradient descent, default = 100000
+        ::param history_size: (int) Number of losses kept in self.history, the oldest are dropped,
+                                    default = 100000
+        ::param record_every: (int) Record the loss of one step in record_every, default = 1
+        ::param callback: (function) Called as callback(step, loss, coefficients)
+                                    on every recorded step, default None
+            The early stop message is logged with the logging module
+            (logging.getLogger("ddc_machine_learning.ml.gradient_descent.polynomial_gradient_descent")).
+        ::param batch_size: (int) Number of rows of each step (mini-batch gradient descent),
+                                    default None, all the rows (batch gradient descent)
+        ::param epochs: (int) Maximum number of passes over the data with a batch_size,
+                                    default None, only limited by steps
+        ::param shuffle: (bool) With a batch_size, shuffle the rows every epoch, default = True
+            Without shuffling, the batches are contiguous rows, the fastest to read from disk.
+        ::param random_state: (int) Seed of the shuffling, default None
+        ::param optimizer: (Class GradientDescent) An optimizer of optimizers.py
+                                    (GradientDescent, Momentum, Adam or LBFGS),
+                                    default None, GradientDescent(learning_rate)
+        ::param scale_x: (bool) Fit on x scaled to [-1, 1], default = False
+            The powers of x in [-1, 1] have similar sizes, so the gradient descent
+            converges in far fewer steps. The coefficients are un-scaled after the fit.
+        ::param method: (string) How the coefficients are fitted, default = "gradient_descent"
+            "gradient_descent": steps of the optimizer
+            "lstsq": least squares (SVD) of the Chebyshev basis of x scaled to [-1, 1]
+            "streaming": least squares (QR) of the Chebyshev basis, updated chunk_size
+                        rows at a time, for data larger than memory
+        ::param x_range: (tuple) (min, max) of x, used to scale x, default None,
+                                    read from the data (an extra pass over x)
+        ::param chunk_size: (int) Number of rows read at a time by "streaming",
+                                    default = 1000000
         """
+        assert method in ("gradient_descent", "lstsq", "streaming"), \
+            """Error: method should be "gradient_descent", "lstsq" or "streaming"."""
         self.n = n
         self.learning_rate = learning_rate
         self.early_stop = early_stop
         self.steps = steps
+        self.callback = callback
+        self.batch_size = batch_size
+        self.epochs = epochs
+        self.shuffle = shuffle
+        self.random_state = random_state
+        self.optimizer = optimizer if optimizer is not None else GradientDescent(learning_rate)
+        self.scale_x = scale_x
+        self.method = method
+        self.x_range = x_range
+        self.chunk_size = chunk_size
+        self.x_center = 0.0
+        self.x_scale = 1.0
+        self.epoch_loss = []
+        self.history = TrainingHistory(history_size, record_every)
         self.coefficients = self.random_coefficients(n)
         self.loss = np.array([])
         self.x_values = np.array([])
@@ -93,6 +168,58 @@ class Polynomial_GD():
         """
         return np.mean(pow(self.f(x_values, coeffs) - y_values, 2))
 
+    def design_matrix(self, x_values, center = 0.0, scale = 1.0):
+        """
+        Function to return the design (Vandermonde) matrix of x values,
+            where column i is u**i for u = (x - center)/scale,
+            so the polynomial is design_matrix(x) @ coeffs.
+
+        ::param x_values: (list[floats])
+        ::param center: (float) default = 0
+        ::param scale: (float) default = 1
+        ::return: (numpy array) (len(x_values), n)-dimensional
+        """
+        u = np.asarray(x_values, dtype = float)
+        if center != 0 or scale != 1:
+            u = (u - center)/scale
+        return np.vander(u, self.n, increasing = True)
+
+
+    def rescale_coefficients(self, coeffs, center, scale):
+        """
+        Function to change the variable of a polynomial from u to x = center + scale*u.
+            The polynomial sum(coeffs[i] * u**i) is sum(new_coeffs[i] * x**i).
+            Use center' = -center/scale and scale' = 1/scale for the other direction.
+
+        ::param coeffs: (numpy array) position of the array corresponds to the exponent power.
+        ::param center: (float)
+        ::param scale: (float)
+        ::return: (numpy array)
+        """
+        # Compose the polynomial with u = (x - center)/scale
+        polynomial = np.polynomial.Polynomial(coeffs)(np.polynomial.Polynomial([-center/scale, 1/scale]))
+        return np.pad(polynomial.coef, (0, len(coeffs) - len(polynomial.coef)))
+
+
+    def loss_and_gradient(self, coefficients, design, y_values):
+        """
+        Function to return the MSE loss and its gradient, from the same residuals.
+            residual = design @ coeffs - y
+            loss = mean(residual**2)
+            gradient = (2/len(y)) * design.T @ residual
+
+        ::param coefficients: (numpy array)
+        ::param design: (numpy array) design matrix of the x values
+        ::param y_values: (numpy array)
+        ::return: (float, numpy array) loss and gradient
+        """
+        residual = design @ coefficients - y_values
+        loss = (residual @ residual)/len(y_values)
+        gradient = (2/len(y_values))*(residual @ design)
+
+        return loss, gradient
+
+
     def gradient_calculation(self, coefficients, x_values, y_values):
         """
         Function to return the gradient of a polynomial MSE loss.
@@ -101,17 +228,12 @@ class Polynomial_GD():
         ::param x_values: (list[floats])
         ::param y_values: (list[floats])    
         """
-        gradient_coeffs =  np.array([0]*len(coefficients))
-
-        for xi in range(len(x_values)):
-            x = x_values[xi]
-            power_array = np.power(
-                np.array([x]*len(coefficients)), np.array(range(len(coefficients))))
-
-            diff = (2/len(x_values))*(self.f(x, coefficients) - y_values[xi])
-            gradient_coeffs = gradient_coeffs + np.multiply(diff, power_array)
+        _, gradient = self.loss_and_gradient(
+            np.asarray(coefficients, dtype = float),
+            self.design_matrix(x_values),
+            np.asarray(y_values, dtype = float))
 
-        return gradient_coeffs
+        return gradient
 
 
     def gradient_descent(
@@ -120,6 +242,10 @@ class Polynomial_GD():
         x_values, y_values):
         """
         Function to predict a polynomial to fit given x and y values.
+        The design matrix is built once, so each step is two matrix-vector products,
+            and the loss comes from the same residuals as the gradient.
+        The losses are recorded in self.history (bounded memory, with the time per step),
+            and self.loss is the recorded losses.
 
         ::param coeffs: (numpy array) position of the array corresponds to the exponent power.
         ::param x_values: (numpy array) 
@@ -129,31 +255,239 @@ class Polynomial_GD():
         ::param cut_off: (float) when, for step n and n+1, mse(n) - mse(n-1) <= cut_off 
         """
         old_loss = self.old_loss
-        mse = self.loss
+        history = self.history
+        design = self.design_matrix(x_values, self.x_center, self.x_scale)
+        y_values = np.asarray(y_values, dtype = float)
+        coeffs = np.asarray(coeffs, dtype = float)
 
+        history.start()
         for i in range(self.steps):
-            new_loss = self.loss_mse(coeffs, x_values, y_values)
-            mse = np.append(mse, new_loss)
+            new_loss, gradient = self.loss_and_gradient(coeffs, design, y_values)
+            if history.record(new_loss) and self.callback is not None:
+                self.callback(history.n_steps - 1, new_loss, coeffs)
             if abs(new_loss - old_loss) <= self.early_stop:
-                print(f"Early cut off, difference of losses between steps is less that {self.early_stop}.")
+                logger.info(f"Early cut off, difference of losses between steps is less that {self.early_stop}.")
                 break
             old_loss = new_loss
 
-            coeffs = coeffs - (self.learning_rate)*self.gradient_calculation(coeffs, x_values, y_values)
+            coeffs = self.optimizer.step(
+                coeffs, new_loss, gradient,
+                lambda coefficients: self.loss_and_gradient(coefficients, design, y_values))
 
-        mse = np.append(mse, self.loss_mse(coeffs, x_values, y_values))
+        history.record(self.loss_and_gradient(coeffs, design, y_values)[0], force = True)
         self.coefficients = coeffs
-        self.loss = mse
+        self.loss = history.loss()
+
+
+    def batches(self, n_rows, rng):
+        """
+        Function to yield the rows of each mini-batch of one epoch.
+        Shuffled batches are sorted random rows, so reading them from a np.memmap
+            goes through the file in order, unshuffled batches are contiguous slices.
+
+        ::param n_rows: (int) Number of rows of the data
+        ::param rng: (numpy Generator)
+        ::return: (generator[numpy array or slice])
+        """
+        if self.shuffle:
+            order = rng.permutation(n_rows)
+            for start in range(0, n_rows, self.batch_size):
+                yield np.sort(order[start:start + self.batch_size])
+        else:
+            for start in range(0, n_rows, self.batch_size):
+                yield slice(start, start + self.batch_size)
+
+
+    def stochastic_gradient_descent(
+        self,
+        coeffs, 
+        x_values, y_values):
+        """
+        Function to predict a polynomial to fit given x and y values, with mini-batches.
+        Each step reads batch_size rows, builds their design matrix,
+            and updates the coefficients with their gradient,
+            so only one mini-batch is in memory and x_values and y_values can be np.memmap.
+        Stops after epochs passes over the data, or steps steps, or when the mean loss
+            of the mini-batches of 2 epochs differ by less than early_stop.
+
+        ::param coeffs: (numpy array) position of the array corresponds to the exponent power.
+        ::param x_values: (numpy array) 
+        ::param y_values: (numpy array) 
+        """
+        rng = np.random.default_rng(self.random_state)
+        old_loss = self.old_loss
+        history = self.history
+        coeffs = np.asarray(coeffs, dtype = float)
+        self.epoch_loss = []
+        step = 0
+
+        history.start()
+        while step < self.steps and (self.epochs is None or len(self.epoch_loss) < self.epochs):
+            losses = 0.0
+            rows_seen = 0
+            for rows in self.batches(len(x_values), rng):
+                design = self.design_matrix(x_values[rows], self.x_center, self.x_scale)
+                batch_y = np.asarray(y_values[rows], dtype = float)
+                new_loss, gradient = self.loss_and_gradient(coeffs, design, batch_y)
+                if history.record(new_loss) and self.callback is not None:
+                    self.callback(history.n_steps - 1, new_loss, coeffs)
+
+                losses += new_loss*len(batch_y)
+                rows_seen += len(batch_y)
+                coeffs = self.optimizer.step(
+                    coeffs, new_loss, gradient,
+                    lambda coefficients: self.loss_and_gradient(coefficients, design, batch_y))
+                step += 1
+                if step >= self.steps:
+                    break
+
+            new_loss = losses/rows_seen
+            self.epoch_loss.append(new_loss)
+            if abs(new_loss - old_loss) <= self.early_stop:
+                logger.info(f"Early cut off, difference of losses between epochs is less that {self.early_stop}.")
+                break
+            old_loss = new_loss
+
+        self.coefficients = coeffs
+        self.loss = history.loss()
+
+
+    def x_scaling(self, x_values):
+        """
+        Function to return the center and scale mapping x to u = (x - center)/scale in [-1, 1],
+            from x_range, or the minimum and maximum of the x values.
+
+        ::param x_values: (numpy array)
+        ::return: (float, float) center and scale
+        """
+        if self.x_range is not None:
+            minimum, maximum = self.x_range
+        else:
+            minimum, maximum = float(np.min(x_values)), float(np.max(x_values))
+
+        # x = center + scale*u maps u in [-1, 1] to [minimum, maximum]
+        center = (maximum + minimum)/2
+        scale = (maximum - minimum)/2 if maximum > minimum else 1.0
+        return center, scale
+
+
+    def chebyshev_coefficients(self, chebyshev, center, scale):
+        """
+        Function to return the coefficients of powers of x, of a polynomial
+            in the Chebyshev basis of u = (x - center)/scale.
+
+        ::param chebyshev: (numpy array) Chebyshev coefficients
+        ::param center: (float)
+        ::param scale: (float)
+        ::return: (numpy array)
+        """
+        coeffs = np.polynomial.chebyshev.cheb2poly(chebyshev)
+        coeffs = np.pad(coeffs, (0, self.n - len(coeffs)))
+        return self.rescale_coefficients(coeffs, center, scale)
+
+
+    def least_squares(self, x_values, y_values):
+        """
+        Function to fit the polynomial directly, as the least squares solution of
+            chebvander(u) @ c = y, for u = (x - center)/scale in [-1, 1].
+        The Chebyshev basis of [-1, 1] is well conditioned, unlike the powers of x,
+            and np.linalg.lstsq solves it with an SVD.
+        The final loss is recorded in self.history.
+
+        ::param x_values: (numpy array)
+        ::param y_values: (numpy array)
+        """
+        center, scale = self.x_scaling(x_values)
+        u = (np.asarray(x_values, dtype = float) - center)/scale
+        y_values = np.asarray(y_values, dtype = float)
+
+        chebyshev, _, _, _ = np.linalg.lstsq(
+            np.polynomial.chebyshev.chebvander(u, self.n - 1), y_values, rcond = None)
+
+        self.coefficients = self.chebyshev_coefficients(chebyshev, center, scale)
+        residual = np.polynomial.chebyshev.chebval(u, chebyshev) - y_values
+        self.history.start()
+        self.history.record((residual @ residual)/len(y_values), force = True)
+        self.loss = self.history.loss()
+
+
+    def streaming_least_squares(self, x_values, y_values):
+        """
+        Function to fit the polynomial directly, chunk_size rows at a time,
+            for u = (x - center)/scale in [-1, 1] and A = chebvander(u).
+        The triangular factor R of the QR decomposition of [A | y] is updated with
+            each chunk (R = qr([R; chunk])), so x_values and y_values can be np.memmap
+            larger than memory, and with x_range the fit is one pass over the data.
+        The coefficients solve R[:-1, :-1] @ c = R[:-1, -1], and R[-1, -1]**2 is the
+            sum of squared residuals, so the final loss needs no extra pass.
+        Unlike the normal equations (A.T @ A) c = A.T @ y, this does not square
+            the condition number, or lose the loss to cancellation when y is large.
+
+        ::param x_values: (numpy array)
+        ::param y_values: (numpy array)
+        """
+        center, scale = self.x_scaling(x_values)
+        triangular = np.zeros((0, self.n + 1))
+
+        for start in range(0, len(x_values), self.chunk_size):
+            u = (np.asarray(x_values[start:start + self.chunk_size], dtype = float) - center)/scale
+            y_chunk = np.asarray(y_values[start:start + self.chunk_size], dtype = float)
+            chunk = np.column_stack((np.polynomial.chebyshev.chebvander(u, self.n - 1), y_chunk))
+            triangular = np.linalg.qr(np.vstack((triangular, chunk)), mode = "r")
+
+        # Pad R to (n+1, n+1), with fewer rows than coefficients
+        triangular = np.vstack((triangular, np.zeros((self.n + 1 - len(triangular), self.n + 1))))
+        chebyshev, _, _, _ = np.linalg.lstsq(triangular[:-1, :-1], triangular[:-1, -1], rcond = None)
+
+        self.coefficients = self.chebyshev_coefficients(chebyshev, center, scale)
+        self.history.start()
+        self.history.record(triangular[-1, -1]**2/len(x_values), force = True)
+        self.loss = self.history.loss()
 
 
     def fit(self, X, y):
         """
         Fit the data into a polynomial.
+        X and y can be lists, numpy arrays, np.memmap or paths to .npy files
+            (which are memory mapped), lists are converted to numpy arrays.
+        With a batch_size, uses mini-batch gradient descent.
+        With method "lstsq" or "streaming", the coefficients are solved directly
+            instead of with gradient descent.
         
         """
+        if isinstance(X, str):
+            X = np.load(X, mmap_mode = "r")
+        if isinstance(y, str):
+            y = np.load(y, mmap_mode = "r")
+        # Lists are converted, np.memmap (an ndarray) are read a mini-batch at a time
+        if not isinstance(X, np.ndarray):
+            X = np.asarray(X, dtype = float)
+        if not isinstance(y, np.ndarray):
+            y = np.asarray(y, dtype = float)
         self.x_values = X
         self.y_values = y
-        self.gradient_descent(self.coefficients, X, y)
+
+        if self.method == "lstsq":
+            return self.least_squares(X, y)
+        if self.method == "streaming":
+            return self.streaming_least_squares(X, y)
+
+        self.optimizer.reset()
+        coefficients = np.asarray(self.coefficients, dtype = float)
+        if self.scale_x:
+            self.x_center, self.x_scale = self.x_scaling(X)
+            coefficients = self.rescale_coefficients(
+                coefficients, -self.x_center/self.x_scale, 1/self.x_scale)
+
+        if self.batch_size is None:
+            self.gradient_descent(coefficients, X, y)
+        else:
+            self.stochastic_gradient_descent(coefficients, X, y)
+
+        if self.scale_x:
+            self.coefficients = self.rescale_coefficients(self.coefficients, self.x_center, self.x_scale)
+            self.x_center = 0.0
+            self.x_scale = 1.0
 
         
     def predict(self, X):
@@ -168,9 +502,10 @@ class Polynomial_GD():
         """
         Function to plot the loss of a gradient descent process.
         """
-        plt.plot(self.loss[10:], 'g+', label = "loss")
-        plt.plot(self.loss[10:], 'r--', label = "loss (smooth)")
-        plt.title(f"Graph of loss after {len(self.loss)} steps of Gradient Descent.")
+        steps = self.history.ordered(self.history.steps)
+        plt.plot(steps[10:], self.loss[10:], 'g+', label = "loss")
+        plt.plot(steps[10:], self.loss[10:], 'r--', label = "loss (smooth)")
+        plt.title(f"Graph of loss after {self.history.n_steps} steps of Gradient Descent.")
         plt.xlabel('steps')
         plt.ylabel('loss')
         plt.legend()
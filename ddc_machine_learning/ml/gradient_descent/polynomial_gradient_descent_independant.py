@@ -1,5 +1,8 @@
+import logging
 import random
 
+logger = logging.getLogger(__name__)
+
 class Polynomial_GD():
     """
     Class to predict a polynomial function from data.
@@ -11,6 +14,10 @@ class Polynomial_GD():
     ::param learning_rate: (float) Learning rate of the gradient descent, default = 0.0001
     ::param early_stop: (float) Stops if loss difference of 2 steps < early_stop, default = 1e-04
     ::param steps: (int) maximum number of steps of gradient descent, default = 100000
+    ::param batch_size: (int) Number of rows per step, default None, all the rows
+    ::param epochs: (int) Maximum number of passes over the data with a batch_size
+    ::param shuffle: (bool) Shuffle the rows every epoch, default = True
+    ::param random_state: (int) Seed of the shuffling
     """
     
     def __init__(
@@ -19,7 +26,11 @@ class Polynomial_GD():
         learning_rate = 0.0001,
         early_stop = 1e-4,
         steps = 100000,
-        initial_coefficients = []
+        initial_coefficients = [],
+        batch_size = None,
+        epochs = None,
+        shuffle = True,
+        random_state = None
     ):
         """
         Initialisation function for predicting a polynomial.
@@ -31,11 +42,22 @@ class Polynomial_GD():
         ::param steps: (int) maximum number of steps of gradient descent, default = 100000
         ::param initial_coefficients: (list) Initial coefficients, len(initial_coefficients) == n.
             If null, will start with all oefficients of 1.
+        ::param batch_size: (int) Number of rows of each step (mini-batch gradient descent),
+                                    default None, all the rows (batch gradient descent)
+        ::param epochs: (int) Maximum number of passes over the data with a batch_size,
+                                    default None, only limited by steps
+        ::param shuffle: (bool) With a batch_size, shuffle the rows every epoch, default = True
+        ::param random_state: (int) Seed of the shuffling, default None
         """
         self.n = n
         self.learning_rate = learning_rate
         self.early_stop = early_stop
         self.steps = steps
+        self.batch_size = batch_size
+        self.epochs = epochs
+        self.shuffle = shuffle
+        self.random_state = random_state
+        self.epoch_loss = []
         self.coefficients = initial_coefficients if len(initial_coefficients) == n else [1]*n
         self.loss = []
         self.x_values = []
@@ -146,7 +168,7 @@ class Polynomial_GD():
             new_loss = self.loss_mse(coeffs, x_values, y_values)
             mse += [new_loss]
             if abs(new_loss - old_loss) <= self.early_stop:
-                print(f"Early cut off, difference of losses between steps is less that {self.early_stop}.")
+                logger.info(f"Early cut off, difference of losses between steps is less that {self.early_stop}.")
                 break
             old_loss = new_loss
 
@@ -163,14 +185,82 @@ class Polynomial_GD():
         self.loss = mse
 
 
+    def batches(self, n_rows, rng):
+        """
+        Function to yield the rows of each mini-batch of one epoch.
+
+        ::param n_rows: (int) Number of rows of the data
+        ::param rng: (random.Random)
+        ::return: (generator[list[int]])
+        """
+        order = list(range(n_rows))
+        if self.shuffle:
+            rng.shuffle(order)
+        for start in range(0, n_rows, self.batch_size):
+            yield sorted(order[start:start + self.batch_size])
+
+
+    def stochastic_gradient_descent(
+        self,
+        coeffs, 
+        x_values, y_values):
+        """
+        Function to predict a polynomial to fit given x and y values, with mini-batches.
+        Each step updates the coefficients with the gradient of batch_size rows.
+        Stops after epochs passes over the data, or steps steps, or when the mean loss
+            of the mini-batches of 2 epochs differ by less than early_stop.
+
+        ::param coeffs: (list[floats]) position of the array corresponds to the exponent power.
+        ::param x_values: (list[floats]) 
+        ::param y_values: (list[floats]) 
+        """
+        rng = random.Random(self.random_state)
+        old_loss = self.old_loss
+        mse = self.loss
+        self.epoch_loss = []
+        step = 0
+
+        while step < self.steps and (self.epochs is None or len(self.epoch_loss) < self.epochs):
+            losses = 0
+            rows_seen = 0
+            for rows in self.batches(len(x_values), rng):
+                batch_x = [x_values[row] for row in rows]
+                batch_y = [y_values[row] for row in rows]
+                new_loss = self.loss_mse(coeffs, batch_x, batch_y)
+                mse += [new_loss]
+                losses += new_loss*len(rows)
+                rows_seen += len(rows)
+
+                gradient = self.gradient_calculation(coeffs, batch_x, batch_y)
+                for i in range(len(coeffs)):
+                    coeffs[i] = coeffs[i] - self.learning_rate*gradient[i]
+                step += 1
+                if step >= self.steps:
+                    break
+
+            new_loss = losses/rows_seen
+            self.epoch_loss.append(new_loss)
+            if abs(new_loss - old_loss) <= self.early_stop:
+                logger.info(f"Early cut off, difference of losses between epochs is less that {self.early_stop}.")
+                break
+            old_loss = new_loss
+
+        self.coefficients = coeffs
+        self.loss = mse
+
+
     def fit(self, X, y):
         """
         Fit the data into a polynomial.
+        With a batch_size, uses mini-batch gradient descent.
         
         """
         self.x_values = X
         self.y_values = y
-        self.gradient_descent(self.coefficients, X, y)
+        if self.batch_size is None:
+            self.gradient_descent(self.coefficients, X, y)
+        else:
+            self.stochastic_gradient_descent(self.coefficients, X, y)
 
         
     def predict(self, X):
@@ -0,0 +1,105 @@
+import time
+
+import numpy as np
+
+
+class TrainingHistory():
+    """
+    Class to keep the loss history of gradient descent in bounded memory.
+    The losses are kept in a preallocated ring buffer of capacity records,
+        and only one step in record_every is recorded,
+        so recording is O(1) time per step and memory does not grow with the steps.
+
+    ::param capacity: (int) Number of records kept, the oldest are overwritten
+    ::param record_every: (int) Record one step in record_every
+    """
+
+    def __init__(self, capacity = 100000, record_every = 1):
+        """
+        Initialisation function of the history, with no records.
+
+        ::param capacity: (int) Number of records kept, default = 100000
+        ::param record_every: (int) Record one step in record_every, default = 1
+
+        ::returns: (Class TrainingHistory)
+        """
+        assert capacity > 0 and record_every > 0, \
+            """Error: capacity and record_every should be positive."""
+        self.capacity = capacity
+        self.record_every = record_every
+        self.steps = np.zeros(capacity, dtype = np.int64)
+        self.losses = np.zeros(capacity)
+        self.step_seconds = np.zeros(capacity)
+        self.n_records = 0
+        self.n_steps = 0
+        self.total_seconds = 0.0
+        self.timed_steps = 0
+        self.last_time = time.perf_counter()
+        self.last_step = 0
+
+
+    def start(self):
+        """
+        Function to start the clock, at the start of training.
+        """
+        self.last_time = time.perf_counter()
+        self.last_step = self.n_steps
+
+
+    def record(self, loss, force = False):
+        """
+        Function to count a step, and record its loss if it is one of record_every steps.
+        Each record also keeps the mean time per step since the record before.
+
+        ::param loss: (float)
+        ::param force: (bool) Record the step even if it is not one of record_every steps,
+                                default = False
+        ::returns: (bool) True if the step was recorded
+        """
+        step = self.n_steps
+        self.n_steps += 1
+        if not force and step % self.record_every != 0:
+            return False
+
+        now = time.perf_counter()
+        position = self.n_records % self.capacity
+        self.steps[position] = step
+        self.losses[position] = loss
+        self.step_seconds[position] = (now - self.last_time)/max(self.n_steps - self.last_step, 1)
+        self.total_seconds += now - self.last_time
+        self.timed_steps += self.n_steps - self.last_step
+        self.n_records += 1
+        self.last_time = now
+        self.last_step = self.n_steps
+
+        return True
+
+
+    def ordered(self, values):
+        """
+        Function to return the records of an array, from the oldest to the newest.
+
+        ::param values: (numpy array) self.steps, self.losses or self.step_seconds
+        ::returns: (numpy array)
+        """
+        if self.n_records <= self.capacity:
+            return values[:self.n_records].copy()
+        return np.roll(values, -(self.n_records % self.capacity))
+
+
+    def loss(self):
+        """
+        Function to return the recorded losses, from the oldest to the newest.
+
+        ::returns: (numpy array)
+        """
+        return self.ordered(self.losses)
+
+
+    def mean_step_seconds(self):
+        """
+        Function to return the mean time of a step over all the recorded steps.
+
+        ::returns: (float)
+        """
+        return self.total_seconds/max(self.timed_steps, 1)
@@ -0,0 +1,90 @@
+"""
+Benchmark of GaussianNaiveBayes.fit_parallel on a synthetic memory mapped dataset.
+To run
+    --python -m ddc_machine_learning.ml.naive_bayes.benchmark_gaussian_naive_bayes
+
+The default dataset is 50M rows x 8 features (3.2 GB of float64),
+fitted on 1, 2, 4, 8 and 16 processes.
+The speed up is only near linear while the processes are not
+limited by the speed of reading the file (the file should fit in the page cache).
+"""
+import argparse
+import os
+import tempfile
+import time
+
+import numpy as np
+
+from .gaussian_naive_bayes import GaussianNaiveBayes
+
+
+def synthetic_data(directory, rows, features, categories = 4, chunk_size = 1000000, seed = 0):
+    """
+    Function to write a synthetic dataset to .npy files, chunk by chunk.
+    Each category is a normal distribution with its own means and variances.
+
+    ::param directory: (string)
+    ::param rows: (int)
+    ::param features: (int)
+    ::param categories: (int) default = 4
+    ::param chunk_size: (int) Number of rows written at a time, default = 1000000
+    ::param seed: (int) default = 0
+    ::returns: (tuple) paths of the X and y .npy files
+    """
+    rng = np.random.default_rng(seed)
+    means = rng.uniform(-5, 5, (categories, features))
+    scales = rng.uniform(0.5, 2, (categories, features))
+
+    X_path = os.path.join(directory, "X.npy")
+    y_path = os.path.join(directory, "y.npy")
+    X = np.lib.format.open_memmap(X_path, mode = "w+", dtype = np.float64, shape = (rows, features))
+    y = np.lib.format.open_memmap(y_path, mode = "w+", dtype = np.int64, shape = (rows,))
+
+    for start in range(0, rows, chunk_size):
+        stop = min(start + chunk_size, rows)
+        labels = rng.integers(0, categories, stop - start)
+        X[start:stop] = means[labels] + scales[labels]*rng.standard_normal((stop - start, features))
+        y[start:stop] = labels
+
+    X.flush()
+    y.flush()
+    return X_path, y_path
+
+
+def benchmark(rows = 50000000, features = 8, jobs = (1, 2, 4, 8, 16), chunk_size = 1000000):
+    """
+    Function to time fit_parallel for different numbers of processes.
+    Prints the time and the speed up over the first number of processes.
+
+    ::param rows: (int) default = 50000000
+    ::param features: (int) default = 8
+    ::param jobs: (tuple[int]) Numbers of processes, default = (1, 2, 4, 8, 16)
+    ::param chunk_size: (int) Number of rows per chunk, default = 1000000
+    ::returns: (dict[float]) Dictionary of number of processes -> seconds
+    """
+    times = {}
+    with tempfile.TemporaryDirectory() as directory:
+        X_path, y_path = synthetic_data(directory, rows, features)
+
+        for n_jobs in jobs:
+            model = GaussianNaiveBayes()
+            start = time.perf_counter()
+            model.fit_parallel(X_path, y_path, n_jobs = n_jobs, chunk_size = chunk_size)
+            times[n_jobs] = time.perf_counter() - start
+
+            print(
+                f"{n_jobs} processes: {times[n_jobs]:.2f} seconds, "
+                f"speed up {times[jobs[0]]/times[n_jobs]:.2f}x")
+
+    return times
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description = "Benchmark GaussianNaiveBayes.fit_parallel.")
+    parser.add_argument("--rows", type = int, default = 50000000)
+    parser.add_argument("--features", type = int, default = 8)
+    parser.add_argument("--jobs", type = int, nargs = "+", default = [1, 2, 4, 8, 16])
+    parser.add_argument("--chunk-size", type = int, default = 1000000)
+    arguments = parser.parse_args()
+
+    benchmark(arguments.rows, arguments.features, tuple(arguments.jobs), arguments.chunk_size)
@@ -1,9 +1,335 @@
-def GaussianNaiveBayes():
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+
+def merge_statistics(count_a, mean_a, m2_a, count_b, mean_b, m2_b):
     """
-    
+    Function to merge the sufficient statistics of two sets of data
+    (Chan et al. parallel variance), per category and feature.
+    m2 is the sum of squared differences from the mean.
+    The merge is exact, so statistics of chunks merge into the statistics of all the data.
+
+    ::param count_a: (numpy array) (categories,) number of rows
+    ::param mean_a: (numpy array) (categories x features) means
+    ::param m2_a: (numpy array) (categories x features) sums of squared differences
+    ::param count_b: (numpy array)
+    ::param mean_b: (numpy array)
+    ::param m2_b: (numpy array)
+    ::returns: (tuple) count, mean and m2 of the merged data
     """
-    def __init__():
+    count = count_a + count_b
+    # Categories with no rows in either set keep a mean of 0
+    weight_b = np.divide(count_b, count, out = np.zeros(count.shape), where = count > 0)[:, None]
+
+    delta = mean_b - mean_a
+    mean = mean_a + delta*weight_b
+    m2 = m2_a + m2_b + delta**2*(count_a[:, None]*weight_b)
+
+    return count, mean, m2
+
+
+def category_statistics(X, y_ids, n_categories):
+    """
+    Function to get the count, mean and sum of squared differences
+    of every feature, for every category.
+    Two passes over X (means, then squared differences) for numerical stability.
+
+    ::param X: (numpy array) (rows x features)
+    ::param y_ids: (numpy array) (rows,) category ids
+    ::param n_categories: (int)
+    ::returns: (tuple) count, mean and m2 of every category
+    """
+    count = np.bincount(y_ids, minlength = n_categories)
+
+    # Sort the rows by category, so each category is one block of rows
+    order = np.argsort(y_ids, kind = "stable")
+    X = X[order]
+    y_ids = y_ids[order]
+    starts = np.concatenate(([0], np.cumsum(count)[:-1]))
+    present = count > 0
+
+    mean = np.zeros((n_categories, X.shape[1]))
+    m2 = np.zeros((n_categories, X.shape[1]))
+    if len(X) == 0:
+        return count, mean, m2
+
+    mean[present] = np.add.reduceat(X, starts[present], axis = 0)/count[present, None]
+    m2[present] = np.add.reduceat((X - mean[y_ids])**2, starts[present], axis = 0)
+
+    return count, mean, m2
+
+
+def shard_statistics(X, y, start, stop, chunk_size, var_smoothing):
+    """
+    Function to fit rows start to stop of the data, chunk_size rows at a time.
+    Runs in a worker process when fitting on several processes.
+    Paths to .npy files are memory mapped, so only the chunks are read into memory.
+
+    ::param X: (string or numpy array) (rows x features), or the path to a .npy file of it
+    ::param y: (string or numpy array) (rows,) categories, or the path to a .npy file of it
+    ::param start: (int) First row
+    ::param stop: (int) Last row (excluded)
+    ::param chunk_size: (int) Number of rows per chunk
+    ::param var_smoothing: (float)
+    ::returns: (Class GaussianNaiveBayes) model of the rows
+    """
+    if isinstance(X, str):
+        X = np.load(X, mmap_mode = "r")
+    if isinstance(y, str):
+        y = np.load(y, mmap_mode = "r")
+
+    model = GaussianNaiveBayes(var_smoothing)
+    for chunk_start in range(start, stop, chunk_size):
+        chunk_stop = min(chunk_start + chunk_size, stop)
+        model.partial_fit(X[chunk_start:chunk_stop], y[chunk_start:chunk_stop])
+
+    return model
+
+
+class GaussianNaiveBayes():
+    """
+    Class for Naive Bayes of continuous data.
+    Each feature is modelled as a normal distribution per category.
+
+    ::param var_smoothing: (float) Fraction of the largest feature variance
+                                added to all variances, for stability
+    """
+
+    def __init__(self, var_smoothing = 1e-9):
         """
         Initialising function.
+        The default model has no data in it.
+
+        ::param var_smoothing: (float) Fraction of the largest feature variance
+                                    added to all variances, default = 1e-9
+
+        ::returns: (Class GaussianNaiveBayes)
+        """
+        self.var_smoothing = var_smoothing
+        self.reset()
+
+
+    def reset(self):
+        """
+        Function to remove all the data from the model.
+        """
+        self.categories = []
+        self.category_index = {}
+        self.counts = np.zeros(0)
+        self.means = np.zeros((0, 0))
+        self.m2 = np.zeros((0, 0))
+        self.variances = np.zeros((0, 0))
+        self.log_prior = np.zeros(0)
+
+
+    def category_ids(self, y):
+        """
+        Function to get the ids of categories.
+        Unseen categories are added, with no rows.
+
+        ::param y: (list or numpy array) categories
+        ::returns: (numpy array)
+        """
+        categories, y_ids = np.unique(np.asarray(y), return_inverse = True)
+        for category in categories.tolist():
+            if category not in self.category_index:
+                self.category_index[category] = len(self.categories)
+                self.categories.append(category)
+
+        index = np.array(
+            [self.category_index[category] for category in categories.tolist()], dtype = np.int64)
+        return index[y_ids.reshape(-1)]
+
+
+    def partial_fit(self, X, y):
+        """
+        Fit a chunk of data into the model.
+        The statistics of the chunk are merged into the model,
+            so fitting chunk by chunk is the same as fitting all the data at once.
+        An empty chunk (e.g. the end of a stream) changes nothing.
+
+        ::param X: (numpy array or list[list]) (rows x features)
+        ::param y: (numpy array or list) (rows,) categories
+        """
+        X = np.asarray(X, dtype = float)
+        if len(X) == 0:
+            return
+        y_ids = self.category_ids(y)
+        self.grow(X.shape[1])
+
+        self.counts, self.means, self.m2 = merge_statistics(
+            self.counts, self.means, self.m2,
+            *category_statistics(X, y_ids, len(self.categories)))
+        self.statistics_changed()
+
+
+    def grow(self, n_features):
+        """
+        Function to add statistics, with no rows, for new categories.
+        The first data sets the number of features.
+
+        ::param n_features: (int) Number of features of the data
+        """
+        if len(self.counts) == 0:
+            self.means = np.zeros((0, n_features))
+            self.m2 = np.zeros((0, n_features))
+        assert n_features == self.means.shape[1], \
+            """Error: The data has a different number of features than the model."""
+
+        new = np.zeros((len(self.categories) - len(self.counts), n_features))
+        self.counts = np.concatenate((self.counts, new[:, 0]))
+        self.means = np.concatenate((self.means, new))
+        self.m2 = np.concatenate((self.m2, new))
+
+
+    def merge(self, other):
+        """
+        Function to merge the statistics of another model into this one.
+        The merge is exact, so merging models of shards of the data
+            gives the model of all the data.
+
+        ::param other: (Class GaussianNaiveBayes)
+        ::returns: (Class GaussianNaiveBayes) self
+        """
+        if len(other.categories) == 0:
+            return self
+
+        ids = self.category_ids(other.categories)
+        self.grow(other.means.shape[1])
+
+        # Other's statistics, in the order of this model's categories
+        counts = np.zeros(len(self.categories))
+        means = np.zeros(self.means.shape)
+        m2 = np.zeros(self.m2.shape)
+        counts[ids] = other.counts
+        means[ids] = other.means
+        m2[ids] = other.m2
+
+        self.counts, self.means, self.m2 = merge_statistics(
+            self.counts, self.means, self.m2, counts, means, m2)
+        self.statistics_changed()
+
+        return self
+
+
+    def fit(self, X, y, chunk_size = None):
+        """
+        Fit the data into the model.
+        With a chunk_size, X is read chunk_size rows at a time,
+            so X can be a memory mapped array larger than memory.
+
+        ::param X: (numpy array or list[list]) (rows x features)
+        ::param y: (numpy array or list) (rows,) categories
+        ::param chunk_size: (int) Number of rows per chunk, default None, all the rows
+        """
+        self.reset()
+
+        if chunk_size is None:
+            chunk_size = max(len(X), 1)
+        for start in range(0, len(X), chunk_size):
+            self.partial_fit(X[start:start + chunk_size], y[start:start + chunk_size])
+
+
+    def fit_parallel(self, X, y, n_jobs = 2, chunk_size = 100000):
+        """
+        Fit the data into the model on several processes.
+        The rows are split into n_jobs shards, each shard is fitted
+            chunk_size rows at a time in a worker process,
+            and the models of the shards are merged into this model.
+        X and y should be paths to .npy files, so each worker memory maps
+            the file instead of receiving a copy of the data.
+
+        ::param X: (string or numpy array) (rows x features), or the path to a .npy file of it
+        ::param y: (string or numpy array) (rows,) categories, or the path to a .npy file of it
+        ::param n_jobs: (int) Number of processes, default = 2
+        ::param chunk_size: (int) Number of rows per chunk, default = 100000
+        """
+        self.reset()
+        n_rows = len(np.load(X, mmap_mode = "r")) if isinstance(X, str) else len(X)
+        bounds = np.linspace(0, n_rows, n_jobs + 1).astype(int)
+
+        shards = []
+        for start, stop in zip(bounds[:-1], bounds[1:]):
+            # Arrays are sliced so each worker is only sent its shard
+            if isinstance(X, str):
+                shards.append((X, y, start, stop))
+            else:
+                shards.append((X[start:stop], y[start:stop], 0, stop - start))
+
+        with ProcessPoolExecutor(max_workers = n_jobs) as executor:
+            models = executor.map(
+                shard_statistics, *zip(*shards),
+                [chunk_size]*len(shards), [self.var_smoothing]*len(shards))
+            for model in models:
+                self.merge(model)
+
+
+    def statistics_changed(self):
+        """
+        Function to update the variances and priors after the statistics changed.
+        """
+        counts = self.counts
+        present = counts > 0
+        self.variances = np.zeros(self.m2.shape)
+        self.variances[present] = self.m2[present]/counts[present, None]
+
+        # Largest variance of the features over all the data (law of total variance)
+        total = counts.sum()
+        total_mean = (counts[:, None]*self.means).sum(axis = 0)/total
+        total_m2 = self.m2.sum(axis = 0) + (counts[:, None]*(self.means - total_mean)**2).sum(axis = 0)
+        self.variances += self.var_smoothing*(total_m2/total).max()
+
+        # Categories without rows have a prior of 0 (log prior of -inf)
+        with np.errstate(divide = "ignore"):
+            self.log_prior = np.log(counts) - np.log(total)
+
+
+    def joint_log_likelihood(self, X):
+        """
+        Function to get the log of P(category) * P(X | category), in batch.
+
+        ::param X: (numpy array) (rows x features)
+        ::returns: (numpy array) (rows x categories)
+        """
+        X = np.asarray(X, dtype = float)
+        log_normaliser = -0.5*np.log(2*np.pi*self.variances).sum(axis = 1)
+
+        scores = np.empty((len(X), len(self.categories)))
+        for cat in range(len(self.categories)):
+            scores[:, cat] = -0.5*(((X - self.means[cat])**2)/self.variances[cat]).sum(axis = 1)
+        scores += log_normaliser + self.log_prior
+
+        return scores
+
+
+    def predict_log_proba(self, X):
+        """
+        Function to get the log probability that each row is each category.
+
+        ::param X: (numpy array or list[list]) (rows x features)
+        ::returns: (numpy array) (rows x categories), columns in the order of self.categories
+        """
+        scores = self.joint_log_likelihood(X)
+        maximum = scores.max(axis = 1, keepdims = True)
+        return scores - maximum - np.log(np.exp(scores - maximum).sum(axis = 1, keepdims = True))
+
+
+    def predict_proba(self, X):
+        """
+        Function to get the probability that each row is each category.
+
+        ::param X: (numpy array or list[list]) (rows x features)
+        ::returns: (numpy array) (rows x categories), columns in the order of self.categories
+        """
+        return np.exp(self.predict_log_proba(X))
+
+
+    def predict(self, X):
+        """
+        Function to get the most probable category of each row.
+
+        ::param X: (numpy array or list[list]) (rows x features)
+        ::returns: (list)
         """
-        pass
\ No newline at end of file
+        return [self.categories[cat] for cat in self.joint_log_likelihood(X).argmax(axis = 1)]
@@ -0,0 +1,103 @@
+import hashlib
+import threading
+from collections import OrderedDict
+
+
+class PredictionCache():
+    """
+    Class for a least recently used (LRU) cache of classification scores.
+    Texts are keyed by a hash of their sorted words,
+    so repeated texts are only scored once.
+
+    ::param capacity: (int) Maximum number of cached texts
+    """
+
+    def __init__(self, capacity):
+        """
+        Initialisation function for the prediction cache.
+        The default cache is empty.
+
+        ::param capacity: (int) Maximum number of cached texts
+
+        ::returns: (Class PredictionCache)
+        """
+        self.capacity = capacity
+        self.scores = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+
+
+    def key(self, words):
+        """
+        Function to get the cache key of a text split into words.
+        The words are sorted, so the key does not depend on the word order.
+
+        ::param words: (list[string])
+        ::returns: (bytes)
+        """
+        return hashlib.blake2b("\0".join(sorted(words)).encode("utf-8"), digest_size = 16).digest()
+
+
+    def get(self, key):
+        """
+        Function to get the cached scores of a key, None if the key is not cached.
+
+        ::param key: (bytes)
+        ::returns: (numpy array or None)
+        """
+        with self.lock:
+            scores = self.scores.get(key)
+            if scores is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+                self.scores.move_to_end(key)
+
+        return scores
+
+
+    def record_hit(self):
+        """
+        Function to count a hit that was not served by get,
+            e.g. a text repeated in the batch that is being scored.
+        """
+        with self.lock:
+            self.hits += 1
+
+
+    def put(self, key, scores):
+        """
+        Function to cache the scores of a key.
+        Removes the least recently used key when the cache is full.
+
+        ::param key: (bytes)
+        ::param scores: (numpy array)
+        """
+        with self.lock:
+            self.scores[key] = scores
+            self.scores.move_to_end(key)
+            while len(self.scores) > self.capacity:
+                self.scores.popitem(last = False)
+
+
+    def clear(self):
+        """
+        Function to remove all the cached scores.
+        The hit and miss statistics are kept.
+        """
+        with self.lock:
+            self.scores.clear()
+
+
+    def info(self):
+        """
+        Function to get the statistics of the cache.
+
+        ::returns: (dict) hits, misses, size and capacity of the cache
+        """
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "size": len(self.scores),
+            "capacity": self.capacity}
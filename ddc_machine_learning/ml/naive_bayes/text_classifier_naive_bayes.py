@@ -1,3 +1,35 @@
+import importlib
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+from itertools import chain
+
+import numpy as np
+
+from .prediction_cache import PredictionCache
+from .text_streams import read_records, read_texts, chunks
+from .tokenizer import Tokenizer, no_cleaning
+from .word_counts import WordCounts, CountView, grow
+
+
+def count_shard(tokenizer, n_features, shard):
+    """
+    # Getting counts
+    Function to count a shard of the training data.
+    Runs in a worker process when fitting on several processes.
+
+    ::param tokenizer: (Class Tokenizer)
+    ::param n_features: (int or None) Number of hashed word columns
+    ::param shard: (dict[list]) Dictionary of categories -> list of strings
+    ::returns: (Class WordCounts)
+    """
+    text_data = {category: tokenizer.tokenize_all(texts) for category, texts in shard.items()}
+    counts = WordCounts(n_features)
+    counts.add(text_data)
+
+    return counts
+
+
 class Naive_Bayes():
     """
     Class for Naive Bayes operations of text data.
@@ -7,6 +39,8 @@ class Naive_Bayes():
                                     are distinct or not
     ::param seperator: (string) String to seperate text to words
     ::param cleaning_function: (string) Function to clean text
+    ::param ngrams: (int) Largest n-gram of words to use as words
+    ::param n_features: (int) Number of hashed word columns, None for an exact vocabulary
     """
 
     def __init__(
@@ -14,9 +48,15 @@ class Naive_Bayes():
         lower = True,
         distinct = True,
         seperator = " ",
-        cleaning_function = lambda x: x,
+        cleaning_function = no_cleaning,
         ignore_words = [],
-        smoothing = 1
+        smoothing = 1,
+        ngrams = 1,
+        token_pattern = None,
+        n_features = None,
+        min_count = 1,
+        max_vocab = None,
+        cache_size = 0
     ):
         """
         Initialisation function for Naives Bayes on string data.
@@ -28,6 +68,14 @@ class Naive_Bayes():
         ::param cleaning_function: (string) Function to clean text
         ::param ignore_words: (string) Words that Naive Bayes should ignore
         ::param smoothing: (string) Number of words on default (Laplace Smoothing)
+        ::param ngrams: (int) Largest n-gram of words to use as words, default = 1 (only words)
+        ::param token_pattern: (string) Regex of a word, used instead of the seperator, default = None
+        ::param n_features: (int) Number of columns to hash the words into (the hashing trick),
+                                    fixing the memory of the counts. Default None, an exact vocabulary
+        ::param min_count: (int) Exact vocabulary only, ignore words counted fewer times, default = 1
+        ::param max_vocab: (int) Exact vocabulary only, only keep the max_vocab most counted words
+        ::param cache_size: (int) Number of texts to keep in a cache of classification scores,
+                                    for repeated texts. Default 0, no cache
         """
         self.cleaning_function = cleaning_function
         self.distinct = distinct
@@ -35,10 +83,30 @@ class Naive_Bayes():
         self.seperator = seperator
         self.smoothing = smoothing
         self.ignore_words = ignore_words # Motivation from Carlos Amaral
+        self.ngrams = ngrams
+        self.token_pattern = token_pattern
+        self.tokenizer = Tokenizer(
+            lower = lower,
+            distinct = distinct,
+            seperator = seperator,
+            cleaning_function = cleaning_function,
+            ignore_words = ignore_words,
+            ngrams = ngrams,
+            token_pattern = token_pattern)
+        self.n_features = n_features
+        self.min_count = min_count
+        self.max_vocab = max_vocab
+        self.cache_size = cache_size
+        self.cache = PredictionCache(cache_size) if cache_size > 0 else None
+        self.counts = self.new_counts()
         self.word_counts_cat = {}
         self.word_counts = {}
         self.text_counts = {}
         self.clasification_scores = []
+        self.log_buffer = np.zeros((0, 0))
+        self.log_counts = self.log_buffer
+        self.log_denominator = np.zeros(0)
+        self.log_prior = np.zeros(0)
 
 
     def lower_distinct(self, text):
@@ -50,62 +118,40 @@ class Naive_Bayes():
             Makes every string lowercase.
         If self.distinct = True:
             Only looks at distinct words per text (no duplicates in text).
+            Words are lowered first, so "The" and "the" are the same word.
         
         ::param text: (dict[list])
         ::return: (list)
         """
-        if self.distinct == True:
-            text = list(set(text))
         if self.lower == True:
             text = [word.lower() for word in text]
+        if self.distinct == True:
+            text = list(dict.fromkeys(text))
 
         return [word for word in text if len(word) > 0]
 
 
-    def split_into_words(self, data):
+    def tokenize(self, data, n_jobs = 1):
         """
         # Data Cleaning
-        Function to get list of words from the text data.
-        Also splits the text into their word components.
-        
-        ::param data: (dict[list])
-        *::returns: (dict[list]) data, where the text is split into word components
-        ::returns: (list) list of words in data 
-        """
-        data = data.copy()
-        # Function to flatten lists
-        word_function = lambda l: [item for sublist in l for item in sublist]
-        words = []
+        Function to split the text data into their word components, with self.tokenizer.
+        Unlike split_into_words, does not build the list of words of the training data,
+            which the counts do not need.
 
+        ::param data: (dict[list] or list)
+        ::param n_jobs: (int) Number of processes to split the text on, default = 1
+        ::returns: (dict[list] or list) data, where the text is split into word components
+        """
         # Assert if its labeled (training) data, or unlabeled (classifying)
         # dict (key, value pairing) is traiing data
         if type(data) == dict:
-            for key in data:
-                # Updates the text data into words
-                data[key] = [self.cleaning_function(text).split(self.seperator) for text in data[key]]
-                data[key] = \
-                    [[word for word in sublist if word not in self.ignore_words] for sublist in data[key]]
-
-                # Clean data
-                text_data = []
-                for text in data[key]:
-                    text_data += [self.lower_distinct(text)]
-
-                data[key] = text_data
-
-                # Flatten lists
-                words += word_function(data[key])
-            return data, list(set(words))
+            return {
+                key: self.tokenizer.tokenize_all(texts, n_jobs = n_jobs)
+                    for key, texts in data.items()}
 
         # list is data to be classified
         elif type(data) == list:
-            data_ = []
-            for text in data:
-                text = self.cleaning_function(text).split(" ")
-                text = self.lower_distinct(text)
-                data_ += [text]
-
-            return data_
+            return self.tokenizer.tokenize_all(data, n_jobs = n_jobs)
         
         # If its not a list or a dict there is an error
         else:
@@ -113,6 +159,25 @@ class Naive_Bayes():
                 Data types should be a dict (for training) or a list (for classifying.)""")
 
 
+    def split_into_words(self, data, n_jobs = 1):
+        """
+        # Data Cleaning
+        Function to get list of words from the text data.
+        Also splits the text into their word components, with self.tokenizer.
+        
+        ::param data: (dict[list] or list)
+        ::param n_jobs: (int) Number of processes to split the text on, default = 1
+        *::returns: (dict[list]) data, where the text is split into word components
+        ::returns: (list) list of words in data 
+        """
+        data = self.tokenize(data, n_jobs = n_jobs)
+        if type(data) == dict:
+            words = set(chain.from_iterable(chain.from_iterable(data.values())))
+            return data, list(words)
+
+        return data
+
+
     def text_count(self, data):
         """
         # Getting counts
@@ -124,41 +189,87 @@ class Naive_Bayes():
         return {category:len(texts) for category, texts in data.items()}
 
     
+    def new_counts(self):
+        """
+        # Getting counts
+        Function to get empty word counts, hashed if self.n_features is set.
+
+        ::returns: (Class WordCounts)
+        """
+        return WordCounts(self.n_features)
+
+
+    def counts_changed(self, columns = None):
+        """
+        # Getting counts
+        Function to refresh the model after self.counts changed (fit, update).
+        Updates the dictionary views of the counts,
+            the text counts and the log probabilities.
+        After a fit (columns = None) the vocabulary is pruned and all the
+            log probabilities are recomputed, after an update only the changed columns.
+
+        ::param columns: (numpy array or None) Column ids of the counts that changed
+        """
+        if columns is None and (self.min_count > 1 or self.max_vocab is not None):
+            self.counts.prune(self.min_count, self.max_vocab)
+
+        self.word_counts, self.word_counts_cat = self.count_views(self.counts)
+        self.text_counts = dict(zip(self.counts.categories, self.counts.text_counts.tolist()))
+        self.log_probabilities(columns)
+
+        # The cached scores are of the old counts
+        if self.cache is not None:
+            self.cache.clear()
+
+
+    def cache_info(self):
+        """
+        # Classification
+        Function to get the hit and miss statistics of the prediction cache.
+
+        ::returns: (dict or None) None if the model has no cache
+        """
+        if self.cache is None:
+            return None
+        return self.cache.info()
+
+
     def word_counts_per_text(self, data, words):
         """
         # Getting counts
         Function to get the words per text.
-        Also splits the text into their word components.
+        Every text is read once, its words are mapped to ids through
+        a vocabulary index and counted into a category x vocabulary matrix.
 
         ::param data: (dict[list])
         ::param words: (list)
-        ::returns: ([dict[int]] Dictionary of words -> counts
-        ::returns: (dict[dict[int]]) Dictionary of 
+        ::returns: (CountView) Dictionary view of words -> counts
+        ::returns: (dict[CountView]) Dictionary of 
                                         categories -> words -> counts
         """
-        word_counts_cat = {}
-        word_counts = {}
-
-        for cat in data.keys():
-            counts = {}
-            for word in words:
+        counts = self.new_counts()
+        counts.word_ids(words)
+        counts.add(data)
 
-                # Adding 1 to all the word counts (Laplace smoothing)
-                # This will prevent a case of 0 probability
-                counts[word] = self.smoothing 
+        return self.count_views(counts)
 
-                for text in data[cat]:
-                    counts[word] += text.count(word)
 
-            word_counts_cat[cat] = counts
-
-        # Get a dictionary of words and total values
-        # Not necessarily needed, but makes the code easier
-        for word in words:
-            word_counts[word] = 0
+    def count_views(self, counts):
+        """
+        # Getting counts
+        Function to get dictionary views over the count matrix.
+        Adds self.smoothing to all the word counts (Laplace smoothing),
+            this will prevent a case of 0 probability.
 
-            for cat in word_counts_cat.keys():
-                word_counts[word] += word_counts_cat[cat][word]
+        ::param counts: (Class WordCounts)
+        ::returns: (CountView) Dictionary view of words -> counts
+        ::returns: (dict[CountView]) Dictionary of 
+                                        categories -> words -> counts
+        """
+        word_counts = CountView(counts, None, self.smoothing)
+        word_counts_cat = {
+            cat: CountView(counts, row, self.smoothing)
+                for row, cat in enumerate(counts.categories)}
 
         return word_counts, word_counts_cat
     
@@ -174,65 +285,150 @@ class Naive_Bayes():
         ::returns: (dict[dict[int]]) Dictionary of 
                                         categories -> words -> counts
         """
-        word_counts_cat = {}
-        word_counts = {}
+        counts = self.new_counts()
+        counts.word_ids(words)
+        counts.add(data)
 
-        for cat in data.keys():
-            counts = {}
-            for word in words:
-                counts[word] = 0 
-                for text in data[cat]:
-                    counts[word] += text.count(word)
+        word_counts = CountView(counts, None, 0)
+        word_counts_cat = {
+            cat: dict(CountView(counts, row, 0).items())
+                for row, cat in enumerate(counts.categories)}
 
-            word_counts_cat[cat] = counts
+        return dict(word_counts.items()), word_counts_cat
 
-        # Get a dictionary of words and total values
-        # Not necessarily needed, but makes the code easier
-        for word in words:
-            word_counts[word] = 0
-            for cat in word_counts_cat.keys():
-                word_counts[word] += word_counts_cat[cat][word]
+    
+    def log_probabilities(self, columns = None):
+        """
+        # Classification
+        Function to precompute the log probabilities used to classify text.
+        p_ -> probability, _w -> word, _c -> category
+            log P(w|c) = log(count(w, c) + smoothing) - log(texts(c) + smoothing)
+        Stores a (categories x vocabulary) table of log(count(w, c) + smoothing),
+            the log(texts(c) + smoothing) denominators and the log prior log P(c).
+        Called after the counts change (fit, update).
+        If columns is given, only those columns of the table are recomputed,
+            the table grows for new words and categories with log(smoothing) (a count of 0).
+
+        ::param columns: (numpy array or None) Column ids of the counts that changed,
+                                                    default None, recompute all the table
+        """
+        counts = self.counts
+        shape = counts.counts.shape
+        text_counts = counts.text_counts.astype(float)
+
+        # Categories without texts have a prior of 0 (log prior of -inf)
+        with np.errstate(divide = "ignore"):
+            if columns is None:
+                self.log_buffer = np.log(counts.counts + self.smoothing)
+            else:
+                self.log_buffer = grow(self.log_buffer, shape, fill = np.log(self.smoothing))
+            self.log_counts = self.log_buffer[:shape[0], :shape[1]]
+            if columns is not None:
+                self.log_counts[:, columns] = np.log(counts.counts[:, columns] + self.smoothing)
+
+            self.log_denominator = np.log(text_counts + self.smoothing)
+            self.log_prior = np.log(text_counts) - np.log(text_counts.sum())
+
+
+    def naive_bayes_scores(self, data):
+        """
+        # Classification
+        Function to get the scores that each text is each category.
+        If the model has a prediction cache, only the texts
+            that are not in the cache are scored.
+
+        ::param data: (list[list[string]]) List of texts split into words
+        ::return: (numpy array) (texts x categories) array of probabilities,
+                                    columns in the order of self.counts.categories
+        """
+        if self.cache is None:
+            return self.compute_scores(data)
+
+        scores = np.empty((len(data), len(self.log_prior)))
+
+        # Texts that are not cached, key -> positions of the texts with that key
+        missing = {}
+        for i, text in enumerate(data):
+            key = self.cache.key(text)
+            if key in missing:
+                # Repeated in the batch, scored with its first occurrence
+                missing[key].append(i)
+                self.cache.record_hit()
+                continue
+
+            cached = self.cache.get(key)
+            if cached is None:
+                missing[key] = [i]
+            else:
+                scores[i] = cached
+
+        # Score every missing text once
+        if len(missing) > 0:
+            new_scores = self.compute_scores([data[positions[0]] for positions in missing.values()])
+            for (key, positions), score in zip(missing.items(), new_scores):
+                scores[positions] = score
+                # A copy, so the cache does not keep the whole batch of scores alive
+                self.cache.put(key, score.copy())
+
+        return scores
+
+
+    def compute_scores(self, data):
+        """
+        # Classification
+        Function to compute the scores that each text is each category.
+        The texts are scored together in log space, 
+            so long texts do not underflow to 0.
+        The words of the texts are held as int arrays, and the log probabilities
+            are gathered one category at a time, so memory is O(words of the texts).
+        Words that are not in the fitted words are ignored.
+
+        ::param data: (list[list[string]]) List of texts split into words
+        ::return: (numpy array) (texts x categories) array of probabilities,
+                                    columns in the order of self.counts.categories
+        """
+        counts = self.counts
+
+        # Sparse (texts x vocabulary) representation of the texts:
+        #    text ids and word ids of every fitted word in the texts, as int arrays
+        text_lengths = np.zeros(len(data), dtype = np.int64)
+
+        def fitted_word_ids():
+            for text_id, text in enumerate(data):
+                ids = counts.known_ids(text)
+                text_lengths[text_id] = len(ids)
+                yield from ids
+
+        word_ids = np.fromiter(fitted_word_ids(), dtype = np.int64)
+        text_ids = np.repeat(np.arange(len(data)), text_lengths)
+
+        # Sum log P(w|c) over the words of each text, one category at a time,
+        #    so memory is O(words) and not O(categories x words)
+        scores = np.empty((len(data), len(self.log_prior)))
+        for cat in range(len(self.log_prior)):
+            scores[:, cat] = np.bincount(
+                text_ids, weights = self.log_counts[cat, word_ids], minlength = len(data))
+        scores -= np.outer(text_lengths, self.log_denominator)
+        scores += self.log_prior
+
+        # Normalise over the categories
+        scores -= scores.max(axis = 1, keepdims = True)
+        scores = np.exp(scores)
+        return scores/scores.sum(axis = 1, keepdims = True)
 
-        return word_counts, word_counts_cat
 
-    
     def naive_bayes_probability(self, text):
         """
         # Classification
         Function to get the score that a string is a 
         certain category.
 
-        ::param text: (string)
-        ::return: (dict[list])
+        ::param text: (list[string]) Text split into words
+        ::return: (list[tuple])
         """
-        scores = []
-
-        for cat in self.word_counts_cat.keys():
-            # Initial probabity (Percentage of strings that are this category)
-            # p_ -> probability, _w -> word, _c -> category
-            initial_prob = self.text_counts[cat]/sum(self.text_counts.values())
-            
-            # Only look at words that intersect with the fitted words
-            word_inter = [val for val in text if val in self.word_counts.keys()]
-
-            prob_multi = 1
-            prob_divide = 1
-            p_w = {cat_:(self.text_counts[cat_]/(sum(self.text_counts.values()))) 
-                        for cat_ in list(self.word_counts_cat.keys())}            
-            for word in word_inter:
-               
-                for cat_ in self.word_counts_cat.keys():
-                    p_w[cat_] = p_w[cat_]*(self.word_counts_cat[cat_][word]/(self.text_counts[cat_]+self.smoothing))
-
-                p_w_c = self.word_counts_cat[cat][word]/(self.text_counts[cat]+self.smoothing)
-                p_c =  initial_prob
-                prob_multi = prob_multi*p_w_c
-            prob_divide = sum(p_w.values())
-            prob = prob_multi*initial_prob/prob_divide
+        scores = self.naive_bayes_scores([text])[0]
             
-            scores += [(cat, prob)]
-            
-        return scores
+        return list(zip(self.counts.categories, scores.tolist()))
 
 
     def naive_bayes(
@@ -247,114 +443,329 @@ class Naive_Bayes():
         ::param data: (list[string])
         ::return: (list[string OR boolean])
         """
-        scores = []
-        
-        for text in data:
-            score = self.naive_bayes_probability(text)
-            scores += [score]
+        scores = self.naive_bayes_scores(data)
         
         # A list(tuples) with categories and scores
-        self.clasification_scores = scores
+        self.clasification_scores = \
+            [list(zip(self.counts.categories, score)) for score in scores.tolist()]
         
+        return self.choose_categories(scores, category, weight)
+
+
+    def choose_categories(self, scores, category, weight):
+        """
+        # Classification
+        Function to turn Naive Bayes scores into a classification.
+        Either returns the categories with the highest Naive Bayes scores,
+            or returns a boolean list checking if a category is greater than a weight.
+
+        ::param scores: (numpy array) (texts x categories) array of probabilities
+        ::param category: (string or None)
+        ::param weight: (float)
+        ::return: (list[string OR boolean])
+        """
+        categories = self.counts.categories
+
         # Return the category by comparing the Naive Bayes scores against the other categories
         if category == None:
-            return [sc[0] for sc in [max(l, key=lambda x:x[1]) for l in scores]]
+            return [categories[cat] for cat in scores.argmax(axis = 1)]
         
         # Is the Naive Bayes greater/equal than the weight provided?
         else:
-            category_score = [
-                [score[1] for score in score_tuples if score[0] == category][0]
-                    for score_tuples in scores]
+            category_score = scores[:, self.counts.category_index[category]]
             
-            return [score >= weight for score in category_score]
+            return (category_score >= weight).tolist()
             
 
-    def fit(self, data):
+    def shards(self, data, shard_size):
+        """
+        # Getting counts
+        Function to split the training data into shards of at most shard_size strings.
+
+        ::param data: (dict[list]) Dictionary of categories -> list of strings
+        ::param shard_size: (int)
+        ::returns: (generator[dict[list]])
+        """
+        for category, texts in data.items():
+            if len(texts) == 0:
+                yield {category: []}
+            for start in range(0, len(texts), shard_size):
+                yield {category: texts[start:start + shard_size]}
+
+
+    def parallel_counts(self, data, n_jobs, shard_size):
+        """
+        # Getting counts
+        Function to count the training data on several processes.
+        Every shard is split into words and counted in a worker process,
+            and the partial counts are merged into the final counts.
+        The cleaning_function must be picklable (not a lambda).
+
+        ::param data: (dict[list]) Dictionary of categories -> list of strings
+        ::param n_jobs: (int) Number of processes
+        ::param shard_size: (int) Number of strings per shard
+        ::returns: (Class WordCounts)
+        """
+        shards = list(self.shards(data, shard_size))
+        counts = self.new_counts()
+        with ProcessPoolExecutor(max_workers = n_jobs) as executor:
+            for partial_counts in executor.map(
+                count_shard, [self.tokenizer]*len(shards), [self.n_features]*len(shards), shards):
+                counts.merge(partial_counts)
+
+        return counts
+
+
+    def fit(self, data, n_jobs = 1, shard_size = 10000):
         """
         # Classification
         Fit Naive Bayes to the data.
         The fitted data should be of a dictionary the shape:
             category -> list of strings
+        If n_jobs > 1, the data is split into shards that are
+            counted on n_jobs processes, giving the same counts.
 
         ::param data: (dict[list[list]]) dictionary of lists        
+        ::param n_jobs: (int) Number of processes, default = 1
+        ::param shard_size: (int) Number of strings per shard when n_jobs > 1, default = 10000
         """
-        text = data.copy()
-        
-        # Get the words of the text
-        text_data, words = self.split_into_words(text)
+        text = data
 
-        # Create two dictionaries:
+        # Count the words into a category x vocabulary matrix, with
         #    words and correspondiong counts
         #    categories to words and corresponding counts
-        word_counts, word_counts_cat = self.word_counts_per_text(text_data, words)
-        
-        # Get the number of strings per category
-        text_counts = self.text_count(text)
+        # as dictionary views over it
+        if n_jobs > 1:
+            self.counts = self.parallel_counts(text, n_jobs, shard_size)
+        else:
+            # Split the text into words
+            text_data = self.tokenize(text)
+            self.counts = self.new_counts()
+            self.counts.add(text_data)
 
-        self.word_counts = word_counts
-        self.word_counts_cat = word_counts_cat
-        self.text_counts = text_counts
+        # Update the views, the number of strings per category and the probabilities
+        self.counts_changed()
 
 
     def classify(
         self, 
         data,
         category = None, 
-        weight = 0.5
+        weight = 0.5,
+        n_jobs = 1
     ):
         """
         # Classification
         Fit Naive Bayes to the data.
 
         ::param data: (list) list of text
+        ::param n_jobs: (int) Number of processes to split the text into words on, default = 1
         ::return: (list)
         """
-        text = data.copy()
-        
         # Get the words of the text
-        words = self.split_into_words(text)
+        words = self.split_into_words(data, n_jobs = n_jobs)
 
         return self.naive_bayes(words, category, weight)
 
 
+    def predict_proba(self, data, n_jobs = 1):
+        """
+        # Classification
+        Function to get the probability that each text is each category.
+        Unlike classify, does not store clasification_scores,
+            so the model can classify from several threads at once.
+
+        ::param data: (list[string]) list of text
+        ::param n_jobs: (int) Number of processes to split the text into words on, default = 1
+        ::return: (numpy array) (texts x categories) array of probabilities,
+                                    columns in the order of self.counts.categories
+        """
+        return self.naive_bayes_scores(self.split_into_words(list(data), n_jobs = n_jobs))
+
+
+    def predict_top_k(self, data, k = 1, n_jobs = 1):
+        """
+        # Classification
+        Function to get the k most probable categories of each text.
+
+        ::param data: (list[string]) list of text
+        ::param k: (int) Number of categories per text, default = 1
+        ::param n_jobs: (int) Number of processes to split the text into words on, default = 1
+        ::return: (numpy array) (texts x k) array of categories, most probable first
+        ::return: (numpy array) (texts x k) array of their probabilities
+        """
+        scores = self.predict_proba(data, n_jobs = n_jobs)
+        k = min(k, scores.shape[1])
+
+        # Unordered top k of each text, then order the k categories
+        top = np.argpartition(-scores, k - 1, axis = 1)[:, :k]
+        top_scores = np.take_along_axis(scores, top, axis = 1)
+        order = np.argsort(-top_scores, axis = 1, kind = "stable")
+        top = np.take_along_axis(top, order, axis = 1)
+
+        categories = np.array(self.counts.categories, dtype = object)
+        return categories[top], np.take_along_axis(top_scores, order, axis = 1)
+
+
+    def predict_threshold(self, data, thresholds = 0.5, n_jobs = 1):
+        """
+        # Classification
+        Function to check which categories of each text have a probability
+        greater/equal than a threshold, for multi-label classification.
+
+        ::param data: (list[string]) list of text
+        ::param thresholds: (float or dict[float]) Threshold of all the categories,
+                                or a dictionary of categories -> thresholds
+                                (categories not in the dictionary are never chosen)
+        ::param n_jobs: (int) Number of processes to split the text into words on, default = 1
+        ::return: (numpy array) (texts x categories) boolean array,
+                                    columns in the order of self.counts.categories
+        """
+        if type(thresholds) == dict:
+            thresholds = np.array([
+                thresholds.get(category, np.inf) for category in self.counts.categories])
+
+        return self.predict_proba(data, n_jobs = n_jobs) >= thresholds
+
+
+    def fit_stream(self, data, chunk_size = 10000):
+        """
+        # Classification
+        Fit Naive Bayes to a stream of data, chunk_size strings at a time.
+        Only one chunk of text is held in memory at once.
+        The data is an iterable of (category, string) pairs, or
+            a path to a JSONL or TSV file of them (see text_streams.read_records).
+
+        ::param data: (iterable[tuple] or string)
+        ::param chunk_size: (int) Number of strings per chunk, default = 10000
+        """
+        self.counts = self.new_counts()
+
+        for chunk in chunks(read_records(data), chunk_size):
+            text = {}
+            for category, string in chunk:
+                text.setdefault(category, []).append(string)
+
+            text_data = self.tokenize(text)
+            self.counts.add(text_data)
+
+        self.counts_changed()
+
+
+    def classify_stream(
+        self,
+        data,
+        category = None,
+        weight = 0.5,
+        chunk_size = 10000
+    ):
+        """
+        # Classification
+        Lazily classify a stream of strings, chunk_size strings at a time.
+        The data is an iterable of strings, or
+            a path to a JSONL or TSV file of them (see text_streams.read_texts).
+        Does not store clasification_scores.
+
+        ::param data: (iterable[string] or string)
+        ::param chunk_size: (int) Number of strings per chunk, default = 10000
+        ::return: (generator[string OR boolean])
+        """
+        for chunk in chunks(read_texts(data), chunk_size):
+            scores = self.naive_bayes_scores(self.split_into_words(chunk))
+            yield from self.choose_categories(scores, category, weight)
+
+
     def update(self, data):
         """
         # Update model
         Function to fit extra text  to the Naive Bayes classifer.
         Update the word_counts, word_counts_cat variables.
+        The cost is of the number of words in data, not of the vocabulary,
+            so the model can be updated with a stream of small batches.
+        data can have new categories, and does not need every fitted category.
+        The vocabulary is not pruned on update.
 
         ::param data: (dict[list[string]]) Dictionary of categories to lists of text
         """
-        text = data.copy()
-        
         # Split the data into words
-        text, words = self.split_into_words(text)
+        text = self.tokenize(data)
 
-        # Create two dictionaries:
-        #    words and correspondiong counts
-        #    categories to words and corresponding counts
-        word_counts_new, word_counts_cat_new = \
-            self.get_cat_word_dicts(text, words)
-
-        # Update the Class dictionaries of words counts for categories
-        for word in words:
-            # Update the exisiting words in the dictionaries
-            if word in self.word_counts.keys():
-                for cat in self.word_counts_cat.keys():
-                    self.word_counts_cat[cat][word] += word_counts_cat_new[cat][word]
-
-            # Update the dictionaries with new words
-            elif word not in self.word_counts.keys():
-                for cat in self.word_counts_cat.keys():
-                    self.word_counts_cat[cat][word] = self.smoothing
-                    self.word_counts_cat[cat][word] += word_counts_cat_new[cat][word]
-
-        # Update the total word counts
-        for word in self.word_counts_cat[cat].keys():
-            self.word_counts[word] = 0
-            for cat in self.word_counts_cat.keys():
-                self.word_counts[word] += self.word_counts_cat[cat][word]
-        
-        text_counts_new = self.text_count(data)
-        for cat in text_counts_new.keys():
-            self.text_counts[cat] += text_counts_new[cat]
\ No newline at end of file
+        # Add the new counts into the count matrix,
+        # the dictionary views of the counts are updated with it
+        columns = self.counts.add(text)
+        self.counts_changed(columns)
+
+
+    def save(self, path):
+        """
+        # Saving
+        Function to save the fitted model into a directory.
+        The counts and log probabilities are saved as .npy arrays,
+            and the settings and vocabulary as JSON.
+        The cleaning_function is saved by name,
+            so it must be a module level function (not a lambda) to be loaded.
+
+        ::param path: (string) Directory, created if it does not exist
+        """
+        self.counts.save(path)
+        np.save(os.path.join(path, "log_counts.npy"), self.log_counts)
+        np.save(os.path.join(path, "log_prior.npy"), self.log_prior)
+
+        cleaning_function = self.cleaning_function
+        settings = {
+            "lower": self.lower,
+            "distinct": self.distinct,
+            "seperator": self.seperator,
+            "cleaning_function": f"{cleaning_function.__module__}:{cleaning_function.__qualname__}",
+            "ignore_words": list(self.ignore_words),
+            "smoothing": self.smoothing,
+            "ngrams": self.ngrams,
+            "token_pattern": self.token_pattern,
+            "n_features": self.n_features,
+            "min_count": self.min_count,
+            "max_vocab": self.max_vocab,
+            "cache_size": self.cache_size}
+        with open(os.path.join(path, "model.json"), "w", encoding = "utf-8") as file:
+            json.dump(settings, file)
+
+
+    @staticmethod
+    def load(path, mmap = True, cleaning_function = None):
+        """
+        # Saving
+        Function to load a model saved with Naive_Bayes.save.
+        With mmap = True the count and log probability arrays are memory mapped,
+            so processes loading the same model share one copy of them.
+        To run
+            --Naive_Bayes.load(path)
+
+        ::param path: (string) Directory
+        ::param mmap: (boolean) Flag to memory map the arrays (read only), default = True
+        ::param cleaning_function: (function) Function to clean text,
+                                        default None, imports the saved cleaning_function
+        ::returns: (Class Naive_Bayes)
+        """
+        with open(os.path.join(path, "model.json"), encoding = "utf-8") as file:
+            settings = json.load(file)
+
+        if cleaning_function is None:
+            module, name = settings["cleaning_function"].split(":")
+            assert "<" not in name, \
+                f"""Error: The cleaning function {name} cannot be imported, please pass cleaning_function."""
+            cleaning_function = importlib.import_module(module)
+            for attribute in name.split("."):
+                cleaning_function = getattr(cleaning_function, attribute)
+        settings["cleaning_function"] = cleaning_function
+
+        model = Naive_Bayes(**settings)
+        model.counts = WordCounts.load(path, mmap = mmap)
+        model.word_counts, model.word_counts_cat = model.count_views(model.counts)
+        model.text_counts = dict(zip(model.counts.categories, model.counts.text_counts.tolist()))
+
+        mmap_mode = "r" if mmap else None
+        model.log_buffer = np.load(os.path.join(path, "log_counts.npy"), mmap_mode = mmap_mode)
+        model.log_counts = model.log_buffer
+        model.log_denominator = np.log(model.counts.text_counts + model.smoothing)
+        model.log_prior = np.load(os.path.join(path, "log_prior.npy"))
+
+        return model
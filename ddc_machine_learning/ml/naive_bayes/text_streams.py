@@ -0,0 +1,73 @@
+import json
+from itertools import islice
+
+
+def read_lines(path):
+    """
+    Function to lazily read the lines of a file, without the line endings.
+
+    ::param path: (string)
+    ::returns: (generator[string])
+    """
+    with open(path, encoding = "utf-8") as file:
+        for line in file:
+            line = line.rstrip("\r\n")
+            if len(line) > 0:
+                yield line
+
+
+def read_records(source):
+    """
+    Function to lazily read labeled text, as (category, text) pairs.
+    The source is either an iterable of (category, text) pairs, or a path to:
+        a JSONL file, of {"category": ..., "text": ...} objects or [category, text] lists
+        a TSV file, of category<tab>text lines
+
+    ::param source: (iterable[tuple] or string)
+    ::returns: (iterable[tuple])
+    """
+    if not isinstance(source, str):
+        return source
+
+    if source.endswith((".jsonl", ".json")):
+        return (
+            (record["category"], record["text"]) if isinstance(record, dict) else tuple(record)
+                for record in map(json.loads, read_lines(source)))
+
+    return (tuple(line.split("\t", 1)) for line in read_lines(source))
+
+
+def read_texts(source):
+    """
+    Function to lazily read unlabeled text.
+    The source is either an iterable of strings, or a path to:
+        a JSONL file, of {"text": ...} objects or strings
+        a TSV file, where the text is the last column of each line
+
+    ::param source: (iterable[string] or string)
+    ::returns: (iterable[string])
+    """
+    if not isinstance(source, str):
+        return source
+
+    if source.endswith((".jsonl", ".json")):
+        return (
+            record["text"] if isinstance(record, dict) else record
+                for record in map(json.loads, read_lines(source)))
+
+    return (line.rsplit("\t", 1)[-1] for line in read_lines(source))
+
+
+def chunks(iterable, chunk_size):
+    """
+    Function to split an iterable into lists of at most chunk_size elements.
+
+    ::param iterable: (iterable)
+    ::param chunk_size: (int)
+    ::returns: (generator[list])
+    """
+    iterator = iter(iterable)
+    chunk = list(islice(iterator, chunk_size))
+    while len(chunk) > 0:
+        yield chunk
+        chunk = list(islice(iterator, chunk_size))
@@ -0,0 +1,131 @@
+import re
+from concurrent.futures import ProcessPoolExecutor
+
+
+def no_cleaning(text):
+    """
+    Default cleaning function, returns the text unchanged.
+    A module level function (not a lambda) so models can be pickled
+    and sent to other processes.
+
+    ::param text: (string)
+    ::return: (string)
+    """
+    return text
+
+
+class Tokenizer():
+    """
+    Class to split text into words, shared by training and classification.
+    The settings are compiled once when the Tokenizer is created.
+
+    ::param lower: (boolean) Flag to lower all words
+    ::param distinct: (boolean) Flag if the words per text
+                                    are distinct or not
+    ::param seperator: (string) String to seperate text to words
+    ::param cleaning_function: (function) Function to clean text
+    ::param ignore_words: (list[string]) Words that should be ignored
+    ::param ngrams: (int) Largest n-gram of words to add to the words
+    ::param token_pattern: (string) Regex of a word, used instead of the seperator
+    """
+
+    def __init__(
+        self,
+        lower = True,
+        distinct = True,
+        seperator = " ",
+        cleaning_function = no_cleaning,
+        ignore_words = [],
+        ngrams = 1,
+        token_pattern = None
+    ):
+        """
+        Initialisation function for the Tokenizer.
+
+        ::param lower: (boolean) Flag to lower all words
+        ::param distinct: (boolean) Flag if the words per text
+                                        are distinct or not
+        ::param seperator: (string) String to seperate text to words
+        ::param cleaning_function: (function) Function to clean text,
+                                        must be picklable to tokenize on several processes
+        ::param ignore_words: (list[string]) Words that should be ignored
+        ::param ngrams: (int) Largest n-gram of words to add to the words, default = 1 (only words)
+        ::param token_pattern: (string) Regex of a word, used instead of the seperator, default = None
+
+        ::returns: (Class Tokenizer)
+        """
+        self.lower = lower
+        self.distinct = distinct
+        self.seperator = seperator
+        self.cleaning_function = cleaning_function
+        self.ngrams = ngrams
+        self.token_pattern = token_pattern
+        self.pattern = re.compile(token_pattern) if token_pattern is not None else None
+
+        # Lowered like the words, so "The" is ignored by ["the"]
+        self.ignore_words = frozenset(
+            word.lower() if lower else word for word in ignore_words)
+
+
+    def tokenize(self, text):
+        """
+        Function to split a text into words.
+        Cleans the text, lowers it, splits it into words, removes empty and ignored words,
+            adds the n-grams, and removes duplicate words (keeping the first).
+
+        ::param text: (string)
+        ::returns: (list[string])
+        """
+        text = self.cleaning_function(text)
+        if self.lower:
+            text = text.lower()
+
+        if self.pattern is not None:
+            words = self.pattern.findall(text)
+        else:
+            words = text.split(self.seperator)
+
+        ignore_words = self.ignore_words
+        words = [word for word in words if word and word not in ignore_words]
+
+        if self.ngrams > 1:
+            words = words + list(self.ngram_words(words))
+
+        if self.distinct:
+            words = list(dict.fromkeys(words))
+
+        return words
+
+
+    def ngram_words(self, words):
+        """
+        Function to get the n-grams (2 to self.ngrams words) of a list of words.
+        The words of an n-gram are joined by a space.
+
+        ::param words: (list[string])
+        ::returns: (generator[string])
+        """
+        for n in range(2, self.ngrams + 1):
+            for start in range(len(words) - n + 1):
+                yield " ".join(words[start:start + n])
+
+
+    def tokenize_all(self, texts, n_jobs = 1, chunksize = 1000):
+        """
+        Function to split a list of texts into words.
+        If n_jobs > 1, the texts are split on n_jobs processes.
+
+        ::param texts: (list[string])
+        ::param n_jobs: (int) Number of processes, default = 1
+        ::param chunksize: (int) Number of texts sent to a process at once, default = 1000
+        ::returns: (list[list[string]])
+        """
+        if n_jobs > 1:
+            with ProcessPoolExecutor(max_workers = n_jobs) as executor:
+                return list(executor.map(self.tokenize, texts, chunksize = chunksize))
+
+        return [self.tokenize(text) for text in texts]
+
+
+    def __call__(self, text):
+        return self.tokenize(text)
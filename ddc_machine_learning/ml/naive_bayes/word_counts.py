@@ -0,0 +1,411 @@
+import json
+import os
+import zlib
+
+import numpy as np
+
+
+def grow(buffer, shape, fill = 0):
+    """
+    Function to get a 2d buffer with room for an array of the given shape.
+    If the buffer is too small (or read only), a new buffer is returned with
+        the old values and double the capacity on the axes that grew,
+        so growing one row or column at a time costs amortised O(1) copies.
+    New values are fill.
+
+    ::param buffer: (numpy array)
+    ::param shape: (tuple) (rows, columns) needed
+    ::param fill: (numeric) default = 0
+    ::returns: (numpy array)
+    """
+    if buffer.flags.writeable and buffer.shape[0] >= shape[0] and buffer.shape[1] >= shape[1]:
+        return buffer
+
+    capacity = tuple(
+        max(needed, 2*old) if needed > old else old for needed, old in zip(shape, buffer.shape))
+    new_buffer = np.full(capacity, fill, dtype = buffer.dtype)
+    new_buffer[:buffer.shape[0], :buffer.shape[1]] = buffer
+
+    return new_buffer
+
+
+class WordCounts():
+    """
+    Class for the word counts of a text Naive Bayes model.
+    Words are mapped to integer ids through a vocabulary index,
+    and the counts are stored in one (categories x vocabulary) count matrix.
+
+    If n_features is given, words are instead hashed into n_features columns
+    (the hashing trick), so the memory of the counts is fixed up front.
+
+    ::param n_features: (int or None) Number of hashed columns, None for an exact vocabulary
+    ::param categories: (list) Categories of the model, in row order
+    ::param vocabulary: (dict[int]) Dictionary of words -> column ids (empty when hashing)
+    ::param counts: (numpy array) Category x vocabulary count matrix,
+                                    a view of a larger buffer with room to grow
+    ::param text_counts: (numpy array) Number of texts per category
+    """
+
+    def __init__(self, n_features = None):
+        """
+        Initialisation function for the word counts.
+        The default counts are empty.
+
+        ::param n_features: (int or None) Number of hashed columns, None for an exact vocabulary
+
+        ::returns: (Class WordCounts)
+        """
+        self.n_features = n_features
+        self.categories = []
+        self.category_index = {}
+        self.vocabulary = {}
+        if n_features is None:
+            self.buffer = np.zeros((0, 0), dtype = np.int64)
+        else:
+            self.buffer = np.zeros((0, n_features), dtype = np.int32)
+        self.counts = self.buffer
+        self.text_counts = np.zeros(0, dtype = np.int64)
+
+
+    def category_ids(self, categories):
+        """
+        # Indexing
+        Function to get the row ids of categories.
+        Unseen categories are added to the index.
+
+        ::param categories: (list)
+        ::returns: (list[int])
+        """
+        for category in categories:
+            if category not in self.category_index:
+                self.category_index[category] = len(self.categories)
+                self.categories.append(category)
+
+        return [self.category_index[category] for category in categories]
+
+
+    def n_columns(self):
+        """
+        # Indexing
+        Function to get the number of columns of the count matrix.
+
+        ::returns: (int)
+        """
+        if self.n_features is None:
+            return len(self.vocabulary)
+        return self.n_features
+
+
+    def hash_ids(self, words):
+        """
+        # Indexing
+        Function to hash words into n_features columns.
+        Uses crc32, which (unlike hash) is the same in every process.
+
+        ::param words: (list[string])
+        ::returns: (list[int])
+        """
+        n_features = self.n_features
+        return [zlib.crc32(word.encode("utf-8")) % n_features for word in words]
+
+
+    def word_ids(self, words):
+        """
+        # Indexing
+        Function to get the column ids of words.
+        Unseen words are added to the vocabulary index.
+
+        ::param words: (list[string])
+        ::returns: (list[int])
+        """
+        if self.n_features is not None:
+            return self.hash_ids(words)
+
+        vocabulary = self.vocabulary
+        return [vocabulary.setdefault(word, len(vocabulary)) for word in words]
+
+
+    def known_ids(self, words):
+        """
+        # Indexing
+        Function to get the column ids of the fitted words.
+        Unseen words are skipped (all words are known when hashing).
+
+        ::param words: (list[string])
+        ::returns: (list[int])
+        """
+        if self.n_features is not None:
+            return self.hash_ids(words)
+
+        vocabulary = self.vocabulary
+        return [vocabulary[word] for word in words if word in vocabulary]
+
+
+    def column(self, word):
+        """
+        # Indexing
+        Function to get the column id of a word, None if the word is not fitted.
+
+        ::param word: (string)
+        ::returns: (int or None)
+        """
+        if self.n_features is not None:
+            return self.hash_ids([word])[0]
+        return self.vocabulary.get(word)
+
+
+    def keys(self):
+        """
+        # Indexing
+        Function to get the keys of the columns, in column order.
+        These are the words, or the column ids when hashing.
+
+        ::returns: (iterable)
+        """
+        if self.n_features is not None:
+            return range(self.n_features)
+        return self.vocabulary.keys()
+
+
+    def add(self, data):
+        """
+        # Getting counts
+        Function to count tokenized texts into the count matrix.
+        Every text is read once, and only the (category, word) cells
+            of the words in the texts are updated, so the cost
+            is of the number of words in data, not of the vocabulary.
+        The column ids of the words are held in one int array,
+            and counted one category at a time.
+
+        ::param data: (dict[list[list]]) Dictionary of categories -> tokenized texts
+        ::returns: (numpy array) Column ids of the counts that changed
+        """
+        category_ids = self.category_ids(list(data.keys()))
+        category_lengths = np.zeros(len(category_ids), dtype = np.int64)
+        text_counts = np.zeros(len(self.categories), dtype = np.int64)
+
+        def all_word_ids():
+            for position, texts in enumerate(data.values()):
+                for text in texts:
+                    ids = self.word_ids(text)
+                    category_lengths[position] += len(ids)
+                    yield from ids
+
+        columns = np.fromiter(all_word_ids(), dtype = np.int64)
+        for category_id, texts in zip(category_ids, data.values()):
+            text_counts[category_id] += len(texts)
+
+        # Grow the existing counts to the new vocabulary and categories
+        self.resize()
+        self.text_counts += text_counts
+        if len(columns) == 0:
+            return np.zeros(0, dtype = np.int64)
+
+        # The words of each category are a contiguous run of columns,
+        #    count every distinct word of the run once
+        changed = []
+        ends = np.cumsum(category_lengths)
+        for category_id, start, end in zip(category_ids, ends - category_lengths, ends):
+            word_columns, word_counts = np.unique(columns[start:end], return_counts = True)
+            self.counts[category_id, word_columns] += word_counts.astype(self.counts.dtype)
+            changed.append(word_columns)
+
+        return np.unique(np.concatenate(changed))
+
+
+    def resize(self):
+        """
+        # Indexing
+        Function to grow the count matrix to the size of the
+        category and vocabulary indexes. New counts are 0.
+        Memory mapped (read only) counts are copied into memory.
+        """
+        shape = (len(self.categories), self.n_columns())
+        self.buffer = grow(self.buffer, shape)
+        self.counts = self.buffer[:shape[0], :shape[1]]
+
+        if len(self.text_counts) < shape[0]:
+            text_counts = np.zeros(shape[0], dtype = np.int64)
+            text_counts[:len(self.text_counts)] = self.text_counts
+            self.text_counts = text_counts
+
+
+    def merge(self, other):
+        """
+        # Getting counts
+        Function to add the counts of another WordCounts into this one.
+        The vocabulary and categories of other are mapped onto this one,
+            so the merge is exact and associative:
+            merging the counts of shards gives the counts of the whole data.
+
+        ::param other: (Class WordCounts)
+        ::returns: (Class WordCounts) self
+        """
+        assert self.n_features == other.n_features, \
+            """Error: Cannot merge counts with a different number of hashed columns."""
+
+        category_ids = self.category_ids(other.categories)
+        word_ids = list(range(self.n_features)) \
+            if self.n_features is not None else self.word_ids(list(other.vocabulary))
+        self.resize()
+
+        # The ids are distinct, so the += does not drop repeated indexes
+        self.counts[np.ix_(category_ids, word_ids)] += other.counts
+        self.text_counts[category_ids] += other.text_counts
+
+        return self
+
+
+    def prune(self, min_count = 1, max_vocab = None):
+        """
+        # Pruning
+        Function to remove rare words from an exact vocabulary.
+        Keeps the words counted at least min_count times over all categories,
+            and of those at most the max_vocab most counted words.
+
+        ::param min_count: (int) default = 1
+        ::param max_vocab: (int or None) default = None, no maximum
+        """
+        if self.n_features is not None:
+            return
+
+        totals = self.counts.sum(axis = 0)
+        keep = np.flatnonzero(totals >= min_count)
+        if max_vocab is not None and len(keep) > max_vocab:
+            most_counted = np.argsort(-totals[keep], kind = "stable")[:max_vocab]
+            keep = np.sort(keep[most_counted])
+
+        if len(keep) == len(self.vocabulary):
+            return
+
+        words = list(self.vocabulary)
+        self.vocabulary = {words[column]: i for i, column in enumerate(keep)}
+        self.buffer = self.counts[:, keep]
+        self.counts = self.buffer
+
+
+    def save(self, path):
+        """
+        # Saving
+        Function to save the counts into a directory.
+        The arrays are saved as .npy files, and the categories and vocabulary
+            (as a list of words in column order) as JSON.
+
+        ::param path: (string) Directory, created if it does not exist
+        """
+        os.makedirs(path, exist_ok = True)
+        np.save(os.path.join(path, "counts.npy"), self.counts)
+        np.save(os.path.join(path, "text_counts.npy"), self.text_counts)
+
+        with open(os.path.join(path, "vocabulary.json"), "w", encoding = "utf-8") as file:
+            json.dump({
+                "n_features": self.n_features,
+                "categories": self.categories,
+                "vocabulary": list(self.vocabulary)}, file)
+
+
+    @staticmethod
+    def load(path, mmap = True):
+        """
+        # Saving
+        Function to load counts saved with WordCounts.save.
+        To run
+            --WordCounts.load(path)
+
+        ::param path: (string) Directory
+        ::param mmap: (boolean) Flag to memory map the arrays (read only), default = True
+        ::returns: (Class WordCounts)
+        """
+        with open(os.path.join(path, "vocabulary.json"), encoding = "utf-8") as file:
+            saved = json.load(file)
+
+        counts = WordCounts(saved["n_features"])
+        counts.category_ids(saved["categories"])
+        counts.vocabulary = {word: i for i, word in enumerate(saved["vocabulary"])}
+
+        mmap_mode = "r" if mmap else None
+        counts.buffer = np.load(os.path.join(path, "counts.npy"), mmap_mode = mmap_mode)
+        counts.counts = counts.buffer
+        counts.text_counts = np.load(os.path.join(path, "text_counts.npy"))
+
+        return counts
+
+
+class CountView():
+    """
+    Class for a read only dictionary view of a row of the count matrix.
+    Used to keep word_counts and word_counts_cat as dictionaries of words -> counts.
+    When hashing, any word can be looked up, and the keys are the column ids.
+
+    ::param word_counts: (Class WordCounts)
+    ::param row: (int or None) Row of the count matrix, None for the total over categories
+    ::param smoothing: (int) Number of words on default (Laplace Smoothing)
+    """
+
+    def __init__(self, word_counts, row, smoothing):
+        """
+        Initialisation function for a view of word counts.
+
+        ::param word_counts: (Class WordCounts)
+        ::param row: (int or None) Row of the count matrix, None for the total over categories
+        ::param smoothing: (int) Number of words on default (Laplace Smoothing)
+
+        ::returns: (Class CountView)
+        """
+        self.word_counts = word_counts
+        self.row = row
+        self.smoothing = smoothing
+
+
+    def values_array(self):
+        """
+        Function to get the smoothed counts of the view, in vocabulary order.
+
+        ::returns: (numpy array)
+        """
+        counts = self.word_counts.counts
+        if self.row is None:
+            return counts.sum(axis = 0) + self.smoothing*counts.shape[0]
+        return counts[self.row] + self.smoothing
+
+
+    def __getitem__(self, word):
+        counts = self.word_counts.counts
+        column = self.word_counts.column(word)
+        if column is None:
+            raise KeyError(word)
+        if self.row is None:
+            return int(counts[:, column].sum()) + self.smoothing*counts.shape[0]
+        return int(counts[self.row, column]) + self.smoothing
+
+
+    def __contains__(self, word):
+        return self.word_counts.column(word) is not None
+
+
+    def __iter__(self):
+        return iter(self.word_counts.keys())
+
+
+    def __len__(self):
+        return self.word_counts.n_columns()
+
+
+    def keys(self):
+        return self.word_counts.keys()
+
+
+    def values(self):
+        return [int(value) for value in self.values_array()]
+
+
+    def items(self):
+        return zip(self.word_counts.keys(), self.values())
+
+
+    def get(self, word, default = None):
+        return self[word] if word in self else default
+
+
+    def __repr__(self):
+        return repr(dict(self.items()))
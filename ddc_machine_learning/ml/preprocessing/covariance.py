@@ -0,0 +1,175 @@
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing.shared_memory import SharedMemory
+
+import numpy as np
+
+
+def gram_blocks(matrix, shift, start, stop, block_size, accumulate = "float64"):
+    """
+    Return the Gram matrix (X - shift).T @ (X - shift) and the column sums of X - shift,
+    for rows start to stop of a matrix, read block_size rows at a time.
+    Each block is multiplied in the type of the matrix (float32 stays float32),
+        and the blocks are summed as chosen by accumulate.
+
+    ::param matrix: (numpy array) (m,n)-dimensional
+    ::param shift: (numpy array) Value subtracted from each row, for numerical stability
+    ::param start: (int) First row
+    ::param stop: (int) Last row (excluded)
+    ::param block_size: (int) Number of rows per block
+    ::param accumulate: (string) How the blocks are summed, default = "float64"
+        "float64": in float64
+        "kahan": in the type of the matrix, with Kahan compensated summation
+        "native": in the type of the matrix
+
+    ::returns: (numpy array) (n,n)-dimensional Gram matrix
+    ::returns: (numpy array) column sums
+    """
+    assert accumulate in ("float64", "kahan", "native"), \
+        """Error: accumulate should be "float64", "kahan" or "native"."""
+    dtype = matrix.dtype if np.issubdtype(matrix.dtype, np.floating) else np.dtype(np.float64)
+    total_dtype = np.float64 if accumulate == "float64" else dtype
+    shift = np.asarray(shift, dtype = dtype)
+
+    gram = np.zeros((matrix.shape[1], matrix.shape[1]), dtype = total_dtype)
+    sums = np.zeros(matrix.shape[1], dtype = total_dtype)
+    # Running compensations of the Kahan summation
+    gram_error = np.zeros(gram.shape, dtype = total_dtype)
+    sums_error = np.zeros(sums.shape, dtype = total_dtype)
+    for block_start in range(start, stop, block_size):
+        block = np.subtract(matrix[block_start:min(block_start + block_size, stop)], shift, dtype = dtype)
+        if accumulate == "kahan":
+            kahan_add(gram, gram_error, block.T @ block)
+            kahan_add(sums, sums_error, block.sum(axis = 0))
+        else:
+            gram += block.T @ block
+            sums += block.sum(axis = 0)
+
+    return gram, sums
+
+
+def kahan_add(total, error, value):
+    """
+    Add value to total in place, with Kahan compensated summation.
+    error holds the low order bits lost by the previous additions,
+        so the rounding error does not grow with the number of additions.
+
+    ::param total: (numpy array) Running sum, updated in place
+    ::param error: (numpy array) Running compensation, updated in place
+    ::param value: (numpy array)
+    """
+    value = value - error
+    new_total = total + value
+    error[:] = (new_total - total) - value
+    total[:] = new_total
+
+
+def shared_gram_blocks(name, shape, dtype, shift, start, stop, block_size, accumulate):
+    """
+    Return gram_blocks of rows start to stop of a matrix in shared memory.
+    Runs in a worker process of parallel_covariance.
+
+    ::param name: (string) Name of the SharedMemory
+    ::param shape: (tuple) Shape of the matrix
+    ::param dtype: (numpy dtype) Type of the matrix
+    ::param shift: (numpy array)
+    ::param start: (int)
+    ::param stop: (int)
+    ::param block_size: (int)
+    ::param accumulate: (string)
+
+    ::returns: (tuple) Gram matrix and column sums
+    """
+    shared = SharedMemory(name = name)
+    try:
+        matrix = np.ndarray(shape, dtype = dtype, buffer = shared.buf)
+        result = gram_blocks(matrix, shift, start, stop, block_size, accumulate)
+        del matrix
+    finally:
+        shared.close()
+
+    return result
+
+
+def reduce_covariance(gram, sums, shift, n_rows):
+    """
+    Return the covariance matrix and mean from the Gram matrix and column sums
+    of the shifted rows: cov = (G - n * d d.T)/n, where d is the mean of the shifted rows.
+
+    ::param gram: (numpy array)
+    ::param sums: (numpy array)
+    ::param shift: (numpy array)
+    ::param n_rows: (int)
+
+    ::returns: (numpy array) covariance matrix
+    ::returns: (numpy array) mean of each column
+    """
+    shifted_mean = sums/n_rows
+    cov = gram/n_rows - np.outer(shifted_mean, shifted_mean)
+
+    return (cov + cov.T)/2, shift + shifted_mean
+
+
+def blocked_covariance(matrix, block_size = 65536, accumulate = "float64"):
+    """
+    Return the covariance matrix and mean of a matrix, in one pass over the rows.
+    The rows are read block_size at a time, so no centred copy of the matrix is made.
+    The rows are shifted by the mean of the first block, which keeps the
+        X.T @ X - n * mean mean.T formula accurate for data far from 0.
+    For a (m,n)-dimensional matrix, returns a (n,n)-dimensional.
+
+    ::param matrix: (numpy array) (m,n)-dimensional
+    ::param block_size: (int) Number of rows per block, default = 65536
+    ::param accumulate: (string) How the blocks are summed, see gram_blocks, default = "float64"
+
+    ::returns: (numpy array) covariance matrix
+    ::returns: (numpy array) mean of each column
+    """
+    shift = np.asarray(matrix[:block_size], dtype = np.float64).mean(axis = 0)
+    gram, sums = gram_blocks(matrix, shift, 0, len(matrix), block_size, accumulate)
+
+    return reduce_covariance(gram, sums, shift, len(matrix))
+
+
+def parallel_covariance(matrix, n_jobs = 2, block_size = 65536, accumulate = "float64"):
+    """
+    Return the covariance matrix and mean of a matrix, computed on several processes.
+    The matrix is copied once into shared memory (multiprocessing.shared_memory),
+        each process accumulates the Gram matrix and column sums of a range of rows,
+        and the partial results are summed into the covariance.
+    Tall matrices are limited by reading the rows, so the speed up follows the
+        memory bandwidth available to the processes (it is largest on multi-socket machines).
+    For a (m,n)-dimensional matrix, returns a (n,n)-dimensional.
+
+    ::param matrix: (numpy array) (m,n)-dimensional
+    ::param n_jobs: (int) Number of processes, default = 2
+    ::param block_size: (int) Number of rows per block, default = 65536
+    ::param accumulate: (string) How the blocks are summed, see gram_blocks, default = "float64"
+
+    ::returns: (numpy array) covariance matrix
+    ::returns: (numpy array) mean of each column
+    """
+    matrix = np.asarray(matrix)
+    shift = np.asarray(matrix[:block_size], dtype = np.float64).mean(axis = 0)
+    bounds = np.linspace(0, len(matrix), n_jobs + 1).astype(int)
+
+    shared = SharedMemory(create = True, size = max(matrix.nbytes, 1))
+    try:
+        shared_matrix = np.ndarray(matrix.shape, dtype = matrix.dtype, buffer = shared.buf)
+        shared_matrix[:] = matrix
+        del shared_matrix
+
+        gram = np.zeros((matrix.shape[1], matrix.shape[1]))
+        sums = np.zeros(matrix.shape[1])
+        with ProcessPoolExecutor(max_workers = n_jobs) as executor:
+            partials = executor.map(
+                shared_gram_blocks,
+                [shared.name]*n_jobs, [matrix.shape]*n_jobs, [matrix.dtype]*n_jobs, [shift]*n_jobs,
+                bounds[:-1], bounds[1:], [block_size]*n_jobs, [accumulate]*n_jobs)
+            for partial_gram, partial_sums in partials:
+                gram += partial_gram
+                sums += partial_sums
+    finally:
+        shared.close()
+        shared.unlink()
+
+    return reduce_covariance(gram, sums, shift, len(matrix))
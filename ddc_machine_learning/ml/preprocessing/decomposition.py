@@ -0,0 +1,185 @@
+import numpy as np
+
+
+def covariance_product(matrix, mean, vectors, chunk_size = 10000):
+    """
+    Return the product of the covariance matrix of a matrix with vectors,
+    cov @ vectors, without forming the covariance or a centred copy of the matrix.
+    The rows are read chunk_size at a time, so the extra memory is
+    one chunk plus the (n,k)-dimensional result.
+    The result has the type of vectors, so float32 data stays float32.
+    For a (m,n)-dimensional matrix and (n,k)-dimensional vectors, returns a (n,k)-dimensional.
+
+    ::param matrix: (numpy array) (m,n)-dimensional
+    ::param mean: (numpy array) Mean of each column
+    ::param vectors: (numpy array) (n,k)-dimensional
+    ::param chunk_size: (int) Number of rows per chunk, default = 10000
+
+    ::returns: (numpy array)
+    """
+    product = np.zeros(vectors.shape, dtype = vectors.dtype)
+    mean = np.asarray(mean, dtype = vectors.dtype)
+    for start in range(0, len(matrix), chunk_size):
+        chunk = np.subtract(matrix[start:start + chunk_size], mean, dtype = vectors.dtype)
+        product += chunk.T @ (chunk @ vectors)
+
+    return product/len(matrix)
+
+
+def randomized_eigh(
+    matrix,
+    mean,
+    n_components,
+    n_oversamples = 10,
+    n_iter = 4,
+    random_state = None,
+    chunk_size = 10000
+):
+    """
+    Return the top eigenvalues and eigenvectors of the covariance matrix of a matrix,
+    with a randomized range finder (Halko et al.) and power iterations.
+    Costs O(m*n*k) time and O(n*k) extra memory for k = n_components + n_oversamples,
+        instead of the O(n^2) memory and O(n^3) time of a full eigendecomposition.
+    A float32 matrix is decomposed in float32.
+
+    ::param matrix: (numpy array) (m,n)-dimensional
+    ::param mean: (numpy array) Mean of each column
+    ::param n_components: (int) Number of eigenvalues to return
+    ::param n_oversamples: (int) Extra random vectors, for accuracy, default = 10
+    ::param n_iter: (int) Number of power iterations, default = 4
+    ::param random_state: (int or None) Seed of the random vectors, default = None
+    ::param chunk_size: (int) Number of rows per chunk, default = 10000
+
+    ::returns: (numpy array) eigenvalues, highest to lowest
+    ::returns: (numpy array) (n_components,n)-dimensional, rows are the eigenvectors
+    """
+    rng = np.random.default_rng(random_state)
+    size = min(n_components + n_oversamples, matrix.shape[1])
+    dtype = np.float32 if matrix.dtype == np.float32 else np.float64
+
+    # Orthonormal basis of the range of the covariance matrix
+    basis, _ = np.linalg.qr(rng.standard_normal((matrix.shape[1], size), dtype = dtype))
+    for _ in range(n_iter):
+        basis, _ = np.linalg.qr(covariance_product(matrix, mean, basis, chunk_size))
+
+    # Eigendecomposition of the covariance matrix projected onto the basis
+    projected = basis.T @ covariance_product(matrix, mean, basis, chunk_size)
+    eigenvalues, eigenvectors = np.linalg.eigh((projected + projected.T)/2)
+
+    order = np.argsort(eigenvalues)[::-1][:n_components]
+    return eigenvalues[order], np.ascontiguousarray((basis @ eigenvectors[:, order]).T)
+
+
+def total_variance(matrix, mean, chunk_size = 10000):
+    """
+    Return the total variance of a matrix, the sum of the variances of the columns
+    (the trace of the covariance matrix), chunk_size rows at a time.
+
+    ::param matrix: (numpy array) (m,n)-dimensional
+    ::param mean: (numpy array) Mean of each column
+    ::param chunk_size: (int) Number of rows per chunk, default = 10000
+
+    ::returns: (float)
+    """
+    total = 0.0
+    for start in range(0, len(matrix), chunk_size):
+        chunk = matrix[start:start + chunk_size] - mean
+        total += float(np.einsum("ij,ij->", chunk, chunk))
+
+    return total/len(matrix)
+
+
+def lanczos_eigh(
+    operator,
+    size,
+    n_components = None,
+    target = None,
+    total = None,
+    tol = 1e-8,
+    check_every = 5,
+    random_state = None,
+    dtype = np.float64
+):
+    """
+    Return the top eigenvalues and eigenvectors of a symmetric positive semi definite matrix,
+    with the Lanczos algorithm (with full reorthogonalization).
+    The matrix is only used through operator(vector) = matrix @ vector.
+    When the Krylov space is invariant (a beta of 0, e.g. with repeated eigenvalues
+        or a low rank matrix), it restarts from a new random vector orthogonal to the basis,
+        so every eigenvalue can be found.
+    Every check_every steps, the eigenvalues of the tridiagonal matrix (Ritz values)
+        are checked, and the algorithm stops as soon as the top ones have converged and
+        either n_components are found, or they add up to target of the total.
+    So k components cost about O(size^2 * k) for a dense (size,size)-dimensional matrix,
+        instead of the O(size^3) of a full eigendecomposition.
+
+    ::param operator: (function) Product of the matrix with a (size,)-dimensional vector
+    ::param size: (int) Number of rows (and columns) of the matrix
+    ::param n_components: (int) Number of eigenvalues to return, default None, use target
+    ::param target: (float) Fraction of total the eigenvalues should add up to, default None
+    ::param total: (float) Sum of all the eigenvalues (the trace), needed with target
+    ::param tol: (float) Residual, relative to the top eigenvalue, of a converged eigenvalue,
+                        default = 1e-8
+    ::param check_every: (int) Number of steps between checks, default = 5
+    ::param random_state: (int or None) Seed of the first vector, default = None
+    ::param dtype: (numpy dtype) default = np.float64
+
+    ::returns: (numpy array) eigenvalues, highest to lowest
+    ::returns: (numpy array) (k,size)-dimensional, rows are the eigenvectors
+    """
+    assert (n_components is None) != (target is None), \
+        """Error: Give one of n_components or target."""
+    assert target is None or total is not None, \
+        """Error: target needs the total of the eigenvalues."""
+
+    rng = np.random.default_rng(random_state)
+    basis = np.zeros((size, size), dtype = dtype)
+    alphas = np.zeros(size)
+    betas = np.zeros(size)
+
+    vector = rng.standard_normal(size).astype(dtype)
+    basis[0] = vector/np.linalg.norm(vector)
+    for step in range(size):
+        vector = operator(basis[step])
+        alphas[step] = basis[step] @ vector
+        # Reorthogonalizing twice against the whole basis keeps it orthonormal
+        for _ in range(2):
+            vector -= basis[:step + 1].T @ (basis[:step + 1] @ vector)
+        betas[step] = np.linalg.norm(vector)
+
+        last = step == size - 1
+        if not last and betas[step] <= tol*max(abs(alphas[:step + 1]).max(), np.finfo(dtype).tiny):
+            # Invariant Krylov space, restart from a random vector orthogonal to the basis
+            vector = rng.standard_normal(size).astype(dtype)
+            for _ in range(2):
+                vector -= basis[:step + 1].T @ (basis[:step + 1] @ vector)
+            betas[step] = 0
+            basis[step + 1] = vector/np.linalg.norm(vector)
+            continue
+
+        if last or (step + 1) % check_every == 0:
+            tridiagonal = np.diag(alphas[:step + 1]) \
+                + np.diag(betas[:step], 1) + np.diag(betas[:step], -1)
+            ritz_values, ritz_vectors = np.linalg.eigh(tridiagonal)
+            ritz_values = ritz_values[::-1]
+            ritz_vectors = ritz_vectors[:, ::-1]
+
+            # Residual of each Ritz pair, the top pairs converge first
+            residuals = np.abs(betas[step]*ritz_vectors[-1])
+            converged = residuals <= tol*max(ritz_values[0], np.finfo(dtype).tiny)
+            n_converged = len(converged) if last else int(np.argmin(np.append(converged, False)))
+
+            if n_components is not None:
+                count = n_components if n_converged >= n_components else None
+            else:
+                reached = np.cumsum(ritz_values[:n_converged]) >= target*total
+                count = int(np.argmax(reached)) + 1 if reached.any() else None
+            if last and count is None:
+                count = len(ritz_values) if n_components is None else min(n_components, len(ritz_values))
+
+            if count is not None:
+                eigenvectors = ritz_vectors[:, :count].T.astype(dtype) @ basis[:step + 1]
+                return ritz_values[:count].astype(dtype), eigenvectors
+
+        if not last:
+            basis[step + 1] = vector/betas[step]
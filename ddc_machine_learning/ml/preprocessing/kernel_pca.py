@@ -0,0 +1,200 @@
+import numpy as np
+
+from .pca import PCA
+
+
+def rbf_kernel(X, Y, gamma):
+    """
+    Return the RBF (Gaussian) kernel exp(-gamma * |x - y|^2) of every row of X with every row of Y.
+    For (a,n) and (b,n)-dimensional matrices, returns a (a,b)-dimensional.
+
+    ::param X: (numpy array) (a,n)-dimensional
+    ::param Y: (numpy array) (b,n)-dimensional
+    ::param gamma: (float)
+
+    ::returns: (numpy array)
+    """
+    # |x - y|^2 = |x|^2 + |y|^2 - 2 x.y, clipped at 0 for the rounding errors
+    kernel = X @ Y.T
+    kernel *= -2
+    kernel += (X*X).sum(axis = 1)[:, None]
+    kernel += (Y*Y).sum(axis = 1)
+    np.maximum(kernel, 0, out = kernel)
+    kernel *= -gamma
+
+    return np.exp(kernel, out = kernel)
+
+
+def polynomial_kernel(X, Y, gamma, degree = 3, coef0 = 1):
+    """
+    Return the polynomial kernel (gamma * x.y + coef0)^degree of every row of X with every row of Y.
+    For (a,n) and (b,n)-dimensional matrices, returns a (a,b)-dimensional.
+
+    ::param X: (numpy array) (a,n)-dimensional
+    ::param Y: (numpy array) (b,n)-dimensional
+    ::param gamma: (float)
+    ::param degree: (int) default = 3
+    ::param coef0: (float) default = 1
+
+    ::returns: (numpy array)
+    """
+    kernel = X @ Y.T
+    kernel *= gamma
+    kernel += coef0
+
+    return np.power(kernel, degree, out = kernel)
+
+
+class KernelPCA():
+    """
+    Class for Kernel PCA, a non linear PCA.
+    The rows are mapped to features whose dot products are the kernel,
+        and the PCA class is fitted on the features.
+    With n_landmarks (Nystrom approximation), the features are the kernel with
+        n_landmarks random rows, so memory is O(rows x n_landmarks) instead of O(rows^2).
+
+    ::param n_components: (int) Number of Principle Components to return
+    ::param kernel: (string) "rbf" or "polynomial"
+    ::param n_landmarks: (int) Number of landmark rows, None for exact Kernel PCA
+    """
+    def __init__(
+        self,
+        n_components,
+        kernel = "rbf",
+        gamma = None,
+        degree = 3,
+        coef0 = 1,
+        n_landmarks = None,
+        tile_size = 4096,
+        random_state = None,
+        solver = "auto",
+        dtype = np.float64
+    ):
+        """
+        Initialisation function for the KernelPCA Class.
+        The default model has no data in it.
+
+        ::param n_components: (int or float) Number of Principle Components to return,
+                                or the fraction of the variance to explain (see PCA)
+        ::param kernel: (string) "rbf" or "polynomial", default = "rbf"
+        ::param gamma: (float) Scale of the kernel, default None, 1/columns
+        ::param degree: (int) Degree of the polynomial kernel, default = 3
+        ::param coef0: (float) Constant of the polynomial kernel, default = 1
+        ::param n_landmarks: (int) Number of landmark rows of the Nystrom approximation,
+                                default None, every row (exact Kernel PCA, O(rows^2) memory)
+        ::param tile_size: (int) Number of rows of the kernel computed at a time, default = 4096
+        ::param random_state: (int) Seed of the landmarks and of the PCA solver, default = None
+        ::param solver: (string) Solver of the PCA of the features, default = "auto"
+        ::param dtype: (numpy dtype) np.float64 or np.float32, default = np.float64
+
+        ::returns: (Class KernelPCA)
+        """
+        assert kernel in ("rbf", "polynomial"), \
+            """Error: kernel should be "rbf" or "polynomial"."""
+        self.n_components = n_components
+        self.kernel = kernel
+        self.gamma = gamma
+        self.degree = degree
+        self.coef0 = coef0
+        self.n_landmarks = n_landmarks
+        self.tile_size = tile_size
+        self.random_state = random_state
+        self.dtype = np.dtype(dtype)
+        self.pca = PCA(n_components, solver = solver, random_state = random_state, dtype = dtype)
+        self.landmarks = np.zeros((0, 0), dtype = self.dtype)
+        self.normalization = np.zeros((0, 0), dtype = self.dtype)
+
+
+    def kernel_matrix(self, X, Y):
+        """
+        Return the kernel of every row of X with every row of Y.
+
+        ::param X: (numpy array) (a,n)-dimensional
+        ::param Y: (numpy array) (b,n)-dimensional
+
+        ::returns: (numpy array) (a,b)-dimensional
+        """
+        X = np.asarray(X, dtype = self.dtype)
+        if self.kernel == "rbf":
+            return rbf_kernel(X, Y, self.kernel_gamma)
+        return polynomial_kernel(X, Y, self.kernel_gamma, self.degree, self.coef0)
+
+
+    def features(self, matrix, out = None):
+        """
+        Map the rows of a matrix to the features of the fitted landmarks,
+            K(rows, landmarks) @ normalization, tile_size rows at a time.
+        The dot products of the features approximate the kernel
+            (they are the kernel when every row is a landmark).
+
+        ::param matrix: (numpy array) (m,n)-dimensional
+        ::param out: (numpy array) (m,features)-dimensional array for the result,
+                                    default None, a new array
+
+        ::returns: (numpy array) out
+        """
+        if out is None:
+            out = np.empty((len(matrix), self.normalization.shape[1]), dtype = self.dtype)
+
+        for start in range(0, len(matrix), self.tile_size):
+            tile = self.kernel_matrix(matrix[start:start + self.tile_size], self.landmarks)
+            np.matmul(tile, self.normalization, out = out[start:start + self.tile_size])
+
+        return out
+
+
+    def fit(self, matrix):
+        """
+        Fit the matrix onto Kernel PCA.
+        The kernel of the landmarks K_mm = U S U.T gives the normalization U S^-1/2,
+            so the features K_nm U S^-1/2 have the Nystrom kernel K_nm K_mm^-1 K_mn
+            as dot products, and PCA centres and decomposes the features.
+        The matrix can be a np.memmap, only the landmarks and tiles of rows are read into memory.
+
+        ::param matrix: (numpy array or list[list]) (m,n)-dimensional
+        """
+        if isinstance(matrix, list):
+            matrix = np.asarray(matrix, dtype = self.dtype)
+        assert matrix.ndim == 2, \
+            """Error: The matrix should be 2 dimensional."""
+        self.kernel_gamma = self.gamma if self.gamma is not None else 1/matrix.shape[1]
+
+        if self.n_landmarks is None or self.n_landmarks >= len(matrix):
+            self.landmarks = np.asarray(matrix, dtype = self.dtype)
+        else:
+            rng = np.random.default_rng(self.random_state)
+            rows = np.sort(rng.choice(len(matrix), self.n_landmarks, replace = False))
+            self.landmarks = np.asarray(matrix[rows], dtype = self.dtype)
+
+        # Landmark kernel eigenvalues near 0 are dropped, like a pseudo inverse
+        eigenvalues, eigenvectors = np.linalg.eigh(self.kernel_matrix(self.landmarks, self.landmarks))
+        keep = eigenvalues > eigenvalues.max()*len(eigenvalues)*np.finfo(self.dtype).eps
+        assert keep.sum() >= self.n_components, \
+            """Error: The kernel of the landmarks has fewer than n_components non zero eigenvalues."""
+        self.normalization = np.ascontiguousarray(eigenvectors[:, keep]/np.sqrt(eigenvalues[keep]))
+
+        self.pca.fit(self.features(matrix))
+
+
+    def transform(self, matrix, out = None):
+        """
+        Transform the matrix, based on the pre-trained fitted model.
+        Works tile_size rows at a time, so only one tile of features is in memory.
+
+        ::param matrix: (numpy array or list[list]) (m,n)-dimensional
+        ::param out: (numpy array) (m,n_components)-dimensional array for the result,
+                                    default None, a new array
+
+        ::returns: (numpy array) out
+        """
+        if isinstance(matrix, list):
+            matrix = np.asarray(matrix, dtype = self.dtype)
+        if out is None:
+            out = np.empty((len(matrix), self.pca.n_fitted_components), dtype = self.dtype)
+
+        for start in range(0, len(matrix), self.tile_size):
+            self.pca.transform(
+                self.features(matrix[start:start + self.tile_size]),
+                out = out[start:start + self.tile_size])
+
+        return out
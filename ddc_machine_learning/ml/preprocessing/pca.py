@@ -1,91 +1,384 @@
+import numpy as np
+
+from .covariance import blocked_covariance, parallel_covariance
+from .decomposition import lanczos_eigh, randomized_eigh, total_variance
 from .matrix_functions import *
 
 class PCA():
     """
     Class for PCA operations.
-    The matrix is represented as a nested list, where each sublist is a row.
+    The matrix is a numpy array, or a nested list where each sublist is a row.
     
-    ::param n_components: (int) Number of Principle Components to return
+    ::param n_components: (int or float) Number of Principle Components to return,
+                            or the fraction of the variance they should explain
+    ::param solver: (string) "full", "randomized", "lanczos" or "auto"
+    ::param dtype: (numpy dtype) np.float64 or np.float32
     """
-    def __init__(self, n_components):
+    def __init__(
+        self,
+        n_components,
+        solver = "auto",
+        n_oversamples = 10,
+        n_iter = 4,
+        random_state = None,
+        n_jobs = 1,
+        dtype = np.float64,
+        accumulate = "float64"
+    ):
         """
         Initialisation function for the PCA Class.
         The default model has no data in it.
         
-        ::param n_components: (int) Number of Principle Components to return
+        ::param n_components: (int or float) Number of Principle Components to return,
+                                or a float between 0 and 1, the fraction of the variance
+                                the Principle Components should explain (e.g. 0.95)
+        ::param solver: (string) How to get the eigenvectors, default = "auto"
+            "full": all the eigenvectors of the covariance matrix (np.linalg.eigh)
+            "randomized": only the top n_components, with a randomized range finder
+            "lanczos": the top eigenvectors of the covariance matrix, until n_components
+                        are found or explain the fraction of the variance
+            "auto": "lanczos" for a float n_components,
+                    "randomized" for large matrices where n_components < 80% of the columns
+        ::param n_oversamples: (int) Extra random vectors of the randomized solver, default = 10
+        ::param n_iter: (int) Power iterations of the randomized solver, default = 4
+        ::param random_state: (int) Seed of the randomized solver, default = None
+        ::param n_jobs: (int) Number of processes computing the covariance matrix
+                                of the "full" solver, default = 1
+        ::param dtype: (numpy dtype) Type of the data, eigenvectors and transformed data,
+                                default = np.float64
+            np.float32 uses 4 bytes per value (8 for float64, over 24 for a nested list),
+                and the eigenvalues and transformed data are within about 1e-5
+                (relative to the largest eigenvalue) of np.float64
+        ::param accumulate: (string) How the covariance of the "full" solver is summed
+                                over the blocks of rows, default = "float64"
+            "float64": in float64, the most accurate
+            "kahan": in dtype, with Kahan compensated summation
+            "native": in dtype
         
         ::returns: (Class PCA)
         """
         self.n_components = n_components
-        self.eigenvalues = []
-        self.eigenvectors = []
-        self.mean = []
+        self.solver = solver
+        self.n_oversamples = n_oversamples
+        self.n_iter = n_iter
+        self.random_state = random_state
+        self.n_jobs = n_jobs
+        self.dtype = np.dtype(dtype)
+        self.accumulate = accumulate
+        assert self.dtype in (np.float32, np.float64), \
+            """Error: dtype should be np.float32 or np.float64."""
+        self.eigenvalues = np.zeros(0, dtype = self.dtype)
+        self.eigenvectors = np.zeros((0, 0), dtype = self.dtype)
+        self.mean = np.zeros(0, dtype = self.dtype)
+        self.n_fitted_components = 0
+        self.total_variance = 0.0
+        self.explained_variance_ratio = np.zeros(0, dtype = self.dtype)
+        self.cumulative_variance = np.zeros(0, dtype = self.dtype)
+        self.singular_values = np.zeros(0, dtype = self.dtype)
         
 
     def variance_explained(self):
         """
-        Print the variance explained by the eigenvectors. 
+        Print the variance explained, and the singular value, of the fitted Principle Components.
+        Uses the arrays stored at fit, so nothing is recomputed.
+        """
+        for i in range(self.n_fitted_components):
+            variance = round(self.explained_variance_ratio[i]*100, 4)
+            singular_value = round(float(self.singular_values[i]), 4)
+            print(f"PC{i} explains {variance}% of the variance (singular value {singular_value}).")
+
+        variance_explain = round(self.cumulative_variance[self.n_fitted_components - 1]*100, 4)
+        print(
+            f"The top {self.n_fitted_components} Principle Components "
+            f"explain {variance_explain}% of the variance.")
+
+
+    def set_variances(self, total_variance, n_rows):
+        """
+        Store the explained variance of the fitted eigenvalues:
+            explained_variance_ratio, the fraction of the total variance of each component,
+            cumulative_variance, the fraction explained by the top components,
+            singular_values, of the centred matrix (eigenvalue = singular value^2/rows).
+
+        ::param total_variance: (float) Sum of the variances of the columns
+        ::param n_rows: (int) Number of rows fitted
+        """
+        eigenvalues = np.asarray(self.eigenvalues, dtype = np.float64)
+        self.total_variance = total_variance
+        self.explained_variance_ratio = (eigenvalues/total_variance).astype(self.dtype)
+        self.cumulative_variance = np.cumsum(self.explained_variance_ratio)
+        self.singular_values = np.sqrt(np.maximum(eigenvalues, 0)*n_rows).astype(self.dtype)
+
+
+    def get_solver(self, shape):
+        """
+        Return the solver to use for a matrix, choosing for solver = "auto".
+        The "lanczos" solver is used when n_components is a fraction of the variance.
+        The randomized solver is used when the matrix is larger than 500 x 500
+            and fewer than 80% of the components are wanted.
+
+        ::param shape: (tuple) (rows, columns) of the matrix
 
-        ::param eigenvalues: (list)
+        ::returns: (string) "full", "randomized" or "lanczos"
         """
+        if isinstance(self.n_components, float):
+            assert 0 < self.n_components <= 1, \
+                """Error: A float n_components should be between 0 and 1."""
+            assert self.solver != "randomized", \
+                """Error: The randomized solver needs an int n_components."""
 
-        explained_variances = []
-        for i in range(len(values)):
-            explained_variances.append(self.eigenvalues[i] / np.sum(values))
+        if self.solver != "auto":
+            assert self.solver in ("full", "randomized", "lanczos"), \
+                """Error: solver should be "full", "randomized", "lanczos" or "auto"."""
+            return self.solver
 
-        variance_explain = 0
-        for i in range(self.n_components):
-            variance = round(explained_variances[i]*100, 4)
-            variance_explained += variance
-            print(f"PC{i} explains {variance}% of the variance.")
-        print(f"The top {n_components} Principle Components explain {variance_explain}% of the variance.")
+        if isinstance(self.n_components, float):
+            return "lanczos"
+        if min(shape) > 500 and self.n_components < 0.8*min(shape):
+            return "randomized"
+        return "full"
 
 
     def fit(self, matrix):
         """
         Fit the matrix onto PCA.
+        With the "full" solver, the eigenvectors and eigenvalues come from np.linalg.eigh
+            of the (symmetric) covariance matrix, ordered from highest eigenvalue to lowest.
+        With the "randomized" solver, only the top n_components are computed.
+        With the "lanczos" solver, the eigenvectors of the covariance matrix are computed
+            from the top one down, and it stops once n_components are found,
+            or, for a float n_components, once they explain that fraction of the variance
+            (if it stops short of the fraction, the "full" solver is used instead).
+        A matrix already of type dtype is not copied.
+        The explained variance ratios, cumulative variance and singular values
+            are stored (see set_variances).
             
-        ::param matrix: (list[list])
+        ::param matrix: (numpy array or list[list])
         """
-        matrix, means = remove_mean(matrix)
-        cov = covariance(matrix)
-        eigenvectors = get_eigenvalues(cov)
-        eigenvectors, eigenvalues = order_eigenvalues(cov, eigenvectors)
+        matrix = np.ascontiguousarray(matrix, dtype = self.dtype)
+        assert matrix.ndim == 2, \
+            """Error: The matrix should be 2 dimensional."""
 
-        self.eigenvalues = eigenvalues
-        self.eigenvectors = eigenvectors
-        self.means = means
+        solver = self.get_solver(matrix.shape)
+        if solver == "randomized":
+            mean = matrix.mean(axis = 0, dtype = np.float64)
+            eigenvalues, eigenvectors = randomized_eigh(
+                matrix, mean, self.n_components,
+                n_oversamples = self.n_oversamples,
+                n_iter = self.n_iter,
+                random_state = self.random_state)
+            variance = total_variance(matrix, mean.astype(self.dtype))
+        else:
+            if self.n_jobs > 1:
+                cov, mean = parallel_covariance(matrix, self.n_jobs, accumulate = self.accumulate)
+            else:
+                cov, mean = blocked_covariance(matrix, accumulate = self.accumulate)
+            cov = cov.astype(self.dtype, copy = False)
+            variance = float(np.trace(cov, dtype = np.float64))
 
+            if solver == "lanczos":
+                target = self.n_components if isinstance(self.n_components, float) else None
+                eigenvalues, eigenvectors = lanczos_eigh(
+                    cov.__matmul__, len(cov),
+                    n_components = None if target else self.n_components,
+                    target = target,
+                    total = variance,
+                    random_state = self.random_state,
+                    dtype = self.dtype)
+                if target and eigenvalues.sum() < target*variance*(1 - 1e-6):
+                    # Lanczos stopped short of the fraction of the variance
+                    solver = "full"
 
-    def transform(self, matrix):
+            if solver == "full":
+                # eigh returns the eigenvalues in ascending order
+                eigenvalues, eigenvectors = np.linalg.eigh(cov)
+                eigenvalues = eigenvalues[::-1]
+                eigenvectors = np.ascontiguousarray(eigenvectors[:, ::-1].T)
+
+        self.eigenvalues = eigenvalues.astype(self.dtype, copy = False)
+        self.eigenvectors = eigenvectors.astype(self.dtype, copy = False)
+        self.mean = mean.astype(self.dtype, copy = False)
+        self.set_variances(variance, len(matrix))
+
+        if isinstance(self.n_components, float):
+            # Number of components explaining the fraction of the variance
+            reached = self.cumulative_variance >= self.n_components*(1 - 1e-6)
+            self.n_fitted_components = int(np.argmax(reached)) + 1 if reached.any() else len(reached)
+        else:
+            self.n_fitted_components = min(self.n_components, len(self.eigenvalues))
+
+
+    def transform(self, matrix, out = None, chunk_size = 65536):
         """
         Transform the matrix, based on the pre-trained fitted model.
+        Each chunk of rows is centred into a scratch buffer of chunk_size rows
+            and projected onto the components with one matrix product written
+            straight into out, so the matrix can be a np.memmap larger than memory.
             
-        ::param matrix: (list[list])
+        ::param matrix: (numpy array or list[list]) (m,n)-dimensional
+        ::param out: (numpy array) (m,n_components)-dimensional array for the result,
+                                    default None, a new array
+        ::param chunk_size: (int) Number of rows per chunk, default = 65536
+
+        ::returns: (numpy array) out
         """
-        _, columns = size(matrix)
+        if isinstance(matrix, list):
+            matrix = np.asarray(matrix, dtype = self.dtype)
+        _, columns = matrix.shape
         
-        assert self.n_components < columns, \
+        assert self.n_fitted_components <= columns, \
             """
             The number of Principle Components wanted is more than the number of columns.
             Please change n_components of the class.
             """
+        assert columns == len(self.mean), \
+            """Error: The matrix has a different number of columns than the fitted matrix."""
+
+        components = self.eigenvectors[:self.n_fitted_components]
+        if out is None:
+            out = np.empty((len(matrix), self.n_fitted_components), dtype = components.dtype)
+
+        # Each chunk is centred into a scratch buffer before the product,
+        # subtracting mean @ components.T after it loses precision in float32
+        scratch = np.empty((min(chunk_size, len(matrix)), columns), dtype = components.dtype)
+        for start in range(0, len(matrix), chunk_size):
+            chunk = matrix[start:start + chunk_size]
+            centred = scratch[:len(chunk)]
+            np.subtract(chunk, self.mean, out = centred)
+            np.matmul(centred, components.T, out = out[start:start + chunk_size])
 
-        matrix_pca = []
-        for i in range(self.n_components):
-            matrix_pca.append([col[0] for col in multiply(matrix, transpose([self.eigenvectors[i]]))])
-        return transpose(matrix_pca)
+        return out
 
 
 
-    def reverse(self, matrix):
+    def reverse(self, matrix, out = None, chunk_size = 65536):
         """
         Reverse the PCA process.
         Data information will be lost.
+        Works chunk by chunk like transform.
             
-        ::param matrix: (list[list])
+        ::param matrix: (numpy array or list[list]) (m,n_components)-dimensional
+        ::param out: (numpy array) (m,n)-dimensional array for the result,
+                                    default None, a new array
+        ::param chunk_size: (int) Number of rows per chunk, default = 65536
 
-        ::returns: (list[list])
+        ::returns: (numpy array) out
         """
+        if isinstance(matrix, list):
+            matrix = np.asarray(matrix, dtype = self.dtype)
+
+        components = self.eigenvectors[:self.n_fitted_components]
+        if out is None:
+            out = np.empty((len(matrix), components.shape[1]), dtype = components.dtype)
+
+        for start in range(0, len(matrix), chunk_size):
+            chunk_out = out[start:start + chunk_size]
+            np.matmul(matrix[start:start + chunk_size], components, out = chunk_out)
+            chunk_out += self.mean
+
+        return out
+
+
+class IncrementalPCA(PCA):
+    """
+    Class for PCA fitted batch by batch, for matrices larger than memory.
+    Keeps the mean and a low rank basis of the rows seen so far (Ross et al.),
+        so memory is bounded by batch_size x columns.
+
+    ::param n_components: (int) Number of Principle Components to return
+    ::param batch_size: (int) Number of rows per batch
+    """
+    def __init__(self, n_components, batch_size = None, dtype = np.float64):
+        """
+        Initialisation function for the IncrementalPCA Class.
+        The default model has no data in it.
+
+        ::param n_components: (int) Number of Principle Components to return
+        ::param batch_size: (int) Number of rows per batch when fitting an array,
+                                    default None, 5 times the number of columns
+        ::param dtype: (numpy dtype) np.float64 or np.float32, default = np.float64
+
+        ::returns: (Class IncrementalPCA)
+        """
+        assert isinstance(n_components, int), \
+            """Error: IncrementalPCA needs an int n_components."""
+        super().__init__(n_components, dtype = dtype)
+        self.batch_size = batch_size
+        self.n_samples_seen = 0
+        self.squared_deviations = 0.0
+
+
+    def partial_fit(self, matrix):
+        """
+        Fit a batch of rows onto the PCA.
+        The batch is stacked under the current basis (scaled by the singular values)
+            and a row correcting for the change of mean, and the SVD of the stack
+            is the new basis.
+        The sum of squared deviations from the mean is merged like the mean
+            (Chan et al.), for the total variance.
+
+        ::param matrix: (numpy array or list[list]) Batch of rows,
+                            the first batch needs at least n_components rows
+        """
+        matrix = np.asarray(matrix, dtype = self.dtype)
+        assert matrix.ndim == 2, \
+            """Error: The matrix should be 2 dimensional."""
+
+        n_seen = self.n_samples_seen
+        n_batch = len(matrix)
+        n_total = n_seen + n_batch
+        batch_mean = matrix.mean(axis = 0)
+        centred = matrix - batch_mean
+        squared_deviations = float(np.einsum("ij,ij->", centred, centred))
+
+        if n_seen == 0:
+            assert n_batch >= self.n_components, \
+                """Error: The first batch needs at least n_components rows."""
+            stacked = centred
+            mean = batch_mean
+        else:
+            mean = self.mean + (batch_mean - self.mean)*n_batch/n_total
+            mean_correction = (n_seen*n_batch/n_total)**0.5*(self.mean - batch_mean)
+            squared_deviations += self.squared_deviations + float(mean_correction @ mean_correction)
+            stacked = np.vstack((
+                self.singular_values[:, None]*self.eigenvectors,
+                centred,
+                mean_correction))
+
+        _, singular_values, eigenvectors = np.linalg.svd(stacked, full_matrices = False)
+
+        self.singular_values = singular_values[:self.n_components]
+        self.eigenvectors = np.ascontiguousarray(eigenvectors[:self.n_components])
+        self.eigenvalues = self.singular_values**2/n_total
+        self.mean = mean
+        self.n_samples_seen = n_total
+        self.squared_deviations = squared_deviations
+        self.n_fitted_components = len(self.eigenvalues)
+        self.set_variances(squared_deviations/n_total, n_total)
+
+
+    def fit(self, matrix):
+        """
+        Fit the matrix onto PCA, batch by batch.
+        The matrix can be an array (or np.memmap), read batch_size rows at a time,
+            or an iterator of batches of rows.
+
+        ::param matrix: (numpy array, list[list] or iterator[numpy array])
+        """
+        self.n_samples_seen = 0
+
+        if isinstance(matrix, list):
+            matrix = np.asarray(matrix, dtype = self.dtype)
+
+        if isinstance(matrix, np.ndarray):
+            batch_size = self.batch_size or 5*matrix.shape[1]
+            # A short last batch is added to the batch before it
+            starts = list(range(0, len(matrix), batch_size))
+            if len(starts) > 1 and len(matrix) - starts[-1] < self.n_components:
+                starts.pop()
+            batches = (matrix[start:stop] for start, stop in zip(starts, starts[1:] + [len(matrix)]))
+        else:
+            batches = matrix
 
-        return multiply(matrix, self.eigenvectors[:self.n_components])
+        for batch in batches:
+            self.partial_fit(batch)